@@ -1,22 +1,53 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response
 import logging
 import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+import orjson
 
 from routers import calculator, products, outlets, chat
 from models.database import init_db
+from middleware.cors import FastCORS
+from services.agent_planner import get_agent_planner
+from services.memory_manager import get_memory_manager
 
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
+
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs once per worker process, after any fork, so the listener thread lives in the worker
+    # Request handlers only enqueue records; a listener thread does the stream I/O
+    root_logger = logging.getLogger()
+    stream_handlers = root_logger.handlers
+    log_listener = QueueListener(queue.SimpleQueue(), *stream_handlers, respect_handler_level=True)
+    root_logger.handlers = [QueueHandler(log_listener.queue)]
+    log_listener.start()
+    try:
+        init_db()
+        # Build the singletons up front so no request pays for (or races on) their construction
+        get_agent_planner()
+        get_memory_manager()
+        yield
+    finally:
+        # Flushes queued records before the original handlers take over again
+        log_listener.stop()
+        root_logger.handlers = stream_handlers
+
+
 app = FastAPI(
     title="Mindhive AI Chatbot API",
     description="Multi-agent chatbot with RAG, Text2SQL, and tool calling",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 allowed_origins = [
@@ -29,35 +60,36 @@ if frontend_url:
     allowed_origins.extend([url.strip() for url in frontend_url.split(",")])
 
 app.add_middleware(
-    CORSMiddleware,
-    allow_origins=allowed_origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    FastCORS,
+    allow_origins=tuple(allowed_origins),
+    allow_methods=("*",),
+    allow_headers=("*",),
 )
 
-init_db()
-
 app.include_router(calculator.router)
 app.include_router(products.router)
 app.include_router(outlets.router)
 app.include_router(chat.router)
 
 
+ROOT_BYTES = orjson.dumps({"message": "Mindhive AI Chatbot API", "status": "running"})
+HEALTH_BYTES = orjson.dumps({"status": "healthy", "service": "mindhive-chatbot"})
+
+
 @app.get("/")
 async def root():
-    return {"message": "Mindhive AI Chatbot API", "status": "running"}
+    return Response(content=ROOT_BYTES, media_type="application/json")
 
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "mindhive-chatbot"}
+    return Response(content=HEALTH_BYTES, media_type="application/json")
 
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     logger.error(f"Unhandled exception: {exc}", exc_info=True)
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"error": "Internal server error", "message": "An unexpected error occurred"}
     )
@@ -65,4 +97,11 @@ async def global_exception_handler(request, exc):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WORKERS", 1))
+    )
@@ -0,0 +1,146 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+ALL_METHODS = ("DELETE", "GET", "HEAD", "OPTIONS", "PATCH", "POST", "PUT")
+# Request headers a preflight may always name, as in Starlette's CORSMiddleware
+SAFELISTED_HEADERS = frozenset({"accept", "accept-language", "content-language", "content-type"})
+
+Header = Tuple[bytes, bytes]
+
+
+class FastCORS:
+    """Pure ASGI CORS middleware for a fixed list of allowed origins.
+
+    Works on the raw scope headers instead of building Starlette
+    Request/Response objects. Preflights are answered inline, other
+    requests get the allow-origin headers added to their response.
+    Preflights are validated like Starlette's CORSMiddleware: origin,
+    requested method and requested headers must all be allowed.
+    Every header value is encoded once here so requests only do
+    dict lookups and list concatenation.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        allow_origins: Iterable[str],
+        allow_methods: Sequence[str] = ("*",),
+        allow_headers: Sequence[str] = ("*",),
+        max_age: int = 600,
+    ) -> None:
+        self.app = app
+
+        if "*" in allow_methods:
+            allow_methods = ALL_METHODS
+        self._allowed_methods = frozenset(method.encode("latin-1") for method in allow_methods)
+        self.allow_all_headers = "*" in allow_headers
+        self._allowed_headers = SAFELISTED_HEADERS | {header.lower() for header in allow_headers}
+
+        # Per-origin response headers, keyed by the raw Origin header value
+        self._origin_headers: Dict[bytes, List[Header]] = {
+            origin.encode("latin-1"): [
+                (b"access-control-allow-origin", origin.encode("latin-1")),
+                (b"access-control-allow-credentials", b"true"),
+            ]
+            for origin in allow_origins
+        }
+
+        self._preflight_headers: List[Header] = [
+            (b"access-control-allow-methods", ", ".join(allow_methods).encode("latin-1")),
+            (b"access-control-max-age", str(max_age).encode("latin-1")),
+            (b"content-type", b"text/plain; charset=utf-8"),
+            (b"vary", b"Origin"),
+        ]
+        if not self.allow_all_headers:
+            self._preflight_headers.append(
+                (b"access-control-allow-headers", ", ".join(allow_headers).encode("latin-1"))
+            )
+
+        self._ok_headers = self._preflight_headers + [(b"content-length", b"2")]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin: Optional[bytes] = None
+        request_method: Optional[bytes] = None
+        request_headers: Optional[bytes] = None
+        for key, value in scope["headers"]:
+            if key == b"origin":
+                origin = value
+            elif key == b"access-control-request-method":
+                request_method = value
+            elif key == b"access-control-request-headers":
+                request_headers = value
+
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+
+        origin_headers = self._origin_headers.get(origin)
+
+        if scope["method"] == "OPTIONS" and request_method is not None:
+            await self._preflight(send, origin_headers, request_method, request_headers)
+            return
+
+        if origin_headers is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cors(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = _add_vary_origin(list(message.get("headers", []))) + origin_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+    async def _preflight(
+        self,
+        send: Send,
+        origin_headers: Optional[List[Header]],
+        request_method: bytes,
+        request_headers: Optional[bytes],
+    ) -> None:
+        failures = []
+        if origin_headers is None:
+            failures.append("origin")
+        if request_method not in self._allowed_methods:
+            failures.append("method")
+        if (
+            not self.allow_all_headers
+            and request_headers is not None
+            and not all(
+                header.strip() in self._allowed_headers
+                for header in request_headers.decode("latin-1").lower().split(",")
+                if header.strip()
+            )
+        ):
+            failures.append("headers")
+
+        if failures:
+            body = ("Disallowed CORS " + ", ".join(failures)).encode("latin-1")
+            status = 400
+            headers = self._preflight_headers + [(b"content-length", str(len(body)).encode("latin-1"))]
+            # Only an allowed origin is echoed back, even when the method or headers are refused
+            if origin_headers is not None:
+                headers = headers + origin_headers
+        else:
+            status, body, headers = 200, b"OK", self._ok_headers + origin_headers
+
+        if self.allow_all_headers and request_headers is not None:
+            headers = headers + [(b"access-control-allow-headers", request_headers)]
+
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+def _add_vary_origin(headers: List[Header]) -> List[Header]:
+    """Fold Origin into an existing Vary header rather than sending a second one."""
+    for i, (key, value) in enumerate(headers):
+        if key.lower() == b"vary":
+            headers[i] = (key, value + b", Origin")
+            return headers
+    headers.append((b"vary", b"Origin"))
+    return headers
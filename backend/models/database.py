@@ -1,8 +1,11 @@
 import logging
 from pathlib import Path
-from sqlalchemy import create_engine, Column, Integer, String, Float, Text
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from typing import Any, Dict, List
+from sqlalchemy import create_engine, event, Column, Index, Integer, String, Float, Text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import QueuePool
 
 logger = logging.getLogger(__name__)
 
@@ -11,9 +14,14 @@ Base = declarative_base()
 
 class Outlet(Base):
     __tablename__ = "outlets"
+    __table_args__ = (
+        Index("ix_outlets_latlon", "lat", "lon"),
+        # Lets inserts dedupe by name in-engine via ON CONFLICT DO NOTHING
+        Index("ux_outlets_name", "name", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, nullable=False, index=True)
+    name = Column(String, nullable=False)
     location = Column(String, nullable=False)
     district = Column(String, nullable=True, index=True)
     hours = Column(String, nullable=True)
@@ -21,17 +29,13 @@ class Outlet(Base):
     lat = Column(Float, nullable=True)
     lon = Column(Float, nullable=True)
     
+    _COLUMNS = ("id", "name", "location", "district", "hours", "services", "lat", "lon")
+    
     def to_dict(self) -> dict:
-        return {
-            "id": self.id,
-            "name": self.name,
-            "location": self.location,
-            "district": self.district,
-            "hours": self.hours,
-            "services": self.services,
-            "lat": self.lat,
-            "lon": self.lon
-        }
+        return {column: getattr(self, column) for column in self._COLUMNS}
+
+
+outlets_table = Outlet.__table__
 
 
 DATABASE_DIR = Path("data")
@@ -44,17 +48,101 @@ engine = create_engine(
         "check_same_thread": False,
         "timeout": 30.0
     },
+    poolclass=QueuePool,
+    pool_size=20,
+    max_overflow=40,
+    pool_pre_ping=False,
+    pool_recycle=-1,
+    query_cache_size=1200,
     echo=False
 )
 
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-64000",
+)
+
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    # journal_mode is persisted in the file, the rest are per-connection
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+# External-content FTS5 index over outlets, kept in sync by triggers
+OUTLETS_FTS_DDL = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS outlets_fts USING fts5(
+        name, location, services, content='outlets', content_rowid='id'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS outlets_fts_ai AFTER INSERT ON outlets BEGIN
+        INSERT INTO outlets_fts(rowid, name, location, services)
+        VALUES (new.id, new.name, new.location, new.services);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS outlets_fts_ad AFTER DELETE ON outlets BEGIN
+        INSERT INTO outlets_fts(outlets_fts, rowid, name, location, services)
+        VALUES ('delete', old.id, old.name, old.location, old.services);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS outlets_fts_au AFTER UPDATE ON outlets BEGIN
+        INSERT INTO outlets_fts(outlets_fts, rowid, name, location, services)
+        VALUES ('delete', old.id, old.name, old.location, old.services);
+        INSERT INTO outlets_fts(rowid, name, location, services)
+        VALUES (new.id, new.name, new.location, new.services);
+    END""",
+)
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
 def init_db() -> None:
+    with engine.connect() as conn:
+        journal_mode = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+    logger.info(f"SQLite journal mode: {journal_mode}")
     Base.metadata.create_all(bind=engine)
+    # create_all skips indexes on tables that already exist
+    for index in outlets_table.indexes:
+        try:
+            index.create(bind=engine, checkfirst=True)
+        except IntegrityError as e:
+            logger.warning(f"Could not create index {index.name}: {e}")
+    _create_outlets_fts()
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA optimize")
     logger.info(f"Database initialized at {DATABASE_URL}")
 
 
+def _create_outlets_fts() -> None:
+    try:
+        with engine.begin() as conn:
+            exists = conn.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='outlets_fts'"
+            ).first() is not None
+            for statement in OUTLETS_FTS_DDL:
+                conn.exec_driver_sql(statement)
+            if not exists:
+                # Index rows inserted before the FTS table existed
+                conn.exec_driver_sql("INSERT INTO outlets_fts(outlets_fts) VALUES ('rebuild')")
+    except OperationalError as e:
+        logger.warning(f"Could not create outlets FTS5 index: {e}")
+
+
+def bulk_insert_outlets(session, rows: List[Dict[str, Any]]) -> int:
+    """Insert outlet rows in one statement, skipping names already stored; returns rows added."""
+    if not rows:
+        return 0
+    result = session.execute(sqlite_insert(outlets_table).on_conflict_do_nothing(), rows)
+    session.commit()
+    return result.rowcount
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from pydantic import BaseModel, ConfigDict, Field
+from pydantic.dataclasses import dataclass
+from typing import Optional, List, Dict, Any, Literal
 
 
 class CalculatorRequest(BaseModel):
@@ -11,7 +12,8 @@ class CalculatorResponse(BaseModel):
     error: Optional[str] = None
 
 
-class ProductResult(BaseModel):
+@dataclass(slots=True)
+class ProductResult:
     name: str
     description: str
     price: Optional[str] = None
@@ -23,7 +25,8 @@ class ProductsResponse(BaseModel):
     summary: Optional[str] = None
 
 
-class OutletResult(BaseModel):
+@dataclass(slots=True)
+class OutletResult:
     id: int
     name: str
     location: str
@@ -39,8 +42,9 @@ class OutletsResponse(BaseModel):
     sql_query: Optional[str] = None
 
 
-class ChatMessage(BaseModel):
-    role: str = Field(..., pattern="^(user|assistant|system)$")
+@dataclass(config=ConfigDict(extra="ignore"), slots=True)
+class ChatMessage:
+    role: Literal["user", "assistant", "system"]
     content: str
     timestamp: Optional[str] = None
 
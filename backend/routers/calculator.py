@@ -1,6 +1,8 @@
 import ast
 import operator
 import logging
+from functools import lru_cache
+from typing import Optional, Tuple, Type, Union
 from fastapi import APIRouter, HTTPException
 from models.schemas import CalculatorRequest, CalculatorResponse
 
@@ -14,62 +16,86 @@ SAFE_OPERATORS = {
 }
 
 
-def safe_eval(node: ast.AST) -> float:
-    if isinstance(node, (ast.Constant if hasattr(ast, 'Constant') else type(None))) and hasattr(node, 'value'):
-        if isinstance(node.value, (int, float)):
-            return float(node.value)
-        raise ValueError("Only numeric constants are allowed")
-    elif hasattr(ast, 'Num') and isinstance(node, ast.Num):
-        return float(node.n)
-    elif isinstance(node, ast.BinOp):
-        left = safe_eval(node.left)
-        right = safe_eval(node.right)
-        op = SAFE_OPERATORS.get(type(node.op))
-        if op is None:
-            raise ValueError(f"Unsupported operator")
-        if right == 0 and isinstance(node.op, (ast.Div, ast.FloorDiv, ast.Mod)):
-            raise ZeroDivisionError("Division by zero")
-        return op(left, right)
-    elif isinstance(node, ast.UnaryOp):
-        return SAFE_OPERATORS.get(type(node.op), lambda x: x)(safe_eval(node.operand))
-    else:
-        raise ValueError(f"Unsupported node type")
+ALLOWED_OP_TYPES = frozenset(SAFE_OPERATORS)
+ROOT_NODE_TYPES = frozenset({ast.BinOp, ast.UnaryOp, ast.Constant})
+ALLOWED_NODES = frozenset({ast.Expression}) | ROOT_NODE_TYPES | ALLOWED_OP_TYPES
+SAFE_GLOBALS = {"__builtins__": {}}
+MAX_EXPRESSION_LENGTH = 512
+# The length cap already bounds the tree; this only stops pathological unary/paren chains
+MAX_DEPTH = 256
+
+
+def _validate(tree: ast.Expression) -> None:
+    stack = [(tree, 0)]
+    while stack:
+        node, depth = stack.pop()
+        if depth > MAX_DEPTH:
+            raise ValueError("Expression is too deeply nested")
+        if type(node) not in ALLOWED_NODES:
+            raise ValueError("Unsupported node type")
+        if type(node) is ast.Constant:
+            if not isinstance(node.value, (int, float)):
+                raise ValueError("Only numeric constants are allowed")
+            # Evaluate in float arithmetic, matching the old walker
+            node.value = float(node.value)
+        stack.extend((child, depth + 1) for child in ast.iter_child_nodes(node))
+
+
+def safe_eval(tree: ast.Expression) -> float:
+    _validate(tree)
+    return float(eval(compile(tree, "<calc>", "eval"), SAFE_GLOBALS))
 
 
 def evaluate_expression(expression: str) -> float:
     expression = expression.strip()
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise ValueError("Expression too long")
+    ok, value = _evaluate_cached(expression)
+    if ok:
+        return value
+    error_type, message = value
+    raise error_type(message)
+
+
+@lru_cache(maxsize=4096)
+def _evaluate_cached(expression: str) -> Tuple[bool, Union[float, Tuple[Type[Exception], str]]]:
+    # Failures are cached as (type, message) so a fresh exception is raised each time
+    try:
+        return True, _evaluate(expression)
+    except (SyntaxError, ZeroDivisionError, ValueError) as e:
+        return False, (type(e), str(e))
+
+
+def _evaluate(expression: str) -> float:
     if not expression:
         raise ValueError("Empty expression")
     
     try:
         tree = ast.parse(expression, mode="eval")
-        body = tree.body
         
-        if isinstance(body, (ast.Constant if hasattr(ast, 'Constant') else type(None))) and hasattr(body, 'value'):
-            if isinstance(body.value, (int, float)):
-                return float(body.value)
-        elif hasattr(ast, 'Num') and isinstance(body, ast.Num):
-            return float(body.n)
-        
-        if not isinstance(body, (ast.BinOp, ast.UnaryOp)):
+        if type(tree.body) not in ROOT_NODE_TYPES:
             raise ValueError("Expression must be a mathematical operation or number")
         
-        return safe_eval(body)
+        return safe_eval(tree)
     except (SyntaxError, ZeroDivisionError) as e:
         raise
     except Exception as e:
         raise ValueError(f"Invalid expression: {str(e)}")
 
 
-@router.post("", response_model=CalculatorResponse)
-async def calculate(request: CalculatorRequest) -> CalculatorResponse:
+def calculate_expression(expression: str) -> Tuple[Optional[float], Optional[str]]:
     try:
-        result = evaluate_expression(request.expression)
-        return CalculatorResponse(result=result, error=None)
+        return evaluate_expression(expression), None
     except ZeroDivisionError:
-        return CalculatorResponse(result=None, error="Division by zero is not allowed")
+        return None, "Division by zero is not allowed"
     except ValueError as e:
-        return CalculatorResponse(result=None, error=f"Invalid expression: {str(e)}")
+        return None, f"Invalid expression: {str(e)}"
     except Exception as e:
-        logger.error(f"Error calculating: {e}", exc_info=True)
-        return CalculatorResponse(result=None, error="An error occurred while evaluating the expression")
+        logger.error("Error calculating: %s", e, exc_info=True)
+        return None, "An error occurred while evaluating the expression"
+
+
+@router.post("", response_model=None, responses={200: {"model": CalculatorResponse}})
+def calculate(request: CalculatorRequest) -> CalculatorResponse:
+    result, error = calculate_expression(request.expression)
+    return CalculatorResponse(result=result, error=error)
@@ -1,80 +1,92 @@
+import asyncio
 import logging
 import re
-from typing import Dict, Any, Optional, List
-from fastapi import APIRouter, HTTPException
+import weakref
+from typing import Dict, Any, Optional, List, Tuple
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
 
-from models.schemas import ChatRequest, ChatResponse, ChatMessage, CalculatorRequest
+from models.schemas import ChatRequest, ChatResponse
 from services.agent_planner import get_agent_planner, AgentPlanner
-from services.memory_manager import get_memory_manager
+from services.memory_manager import get_memory_manager, MemoryManager, HistoryEntry
 
-from routers.calculator import calculate as calculate_endpoint
-from routers.products import search_products as search_products_endpoint
-from routers.outlets import search_outlets as search_outlets_endpoint
+from routers.calculator import calculate_expression
+from routers.products import find_products
+from routers.outlets import find_outlets
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
+# Whole-word matches so "this" no longer counts as a greeting
+WORD_PATTERN = re.compile(r"[a-z']+")
+GREETING_WORDS = frozenset({'hello', 'hi', 'hey', 'greetings'})
+HELP_WORDS = frozenset({'help', 'capabilities'})
+HELP_PHRASES = ('what can you do',)
+
+# Bare arithmetic such as "2 + 2" or "(3*4)/2" skips the planner entirely
+CALC_FASTPATH_PATTERN = re.compile(r'^[\d\s+\-*/().%]+$')
+CALC_OPERATOR_PATTERN = re.compile(r'\d[\s)]*[+\-*/%]')
+# Dates ("2025-01-01", "10/12/2025"), zero-padded or space-split numbers ("012-345 6789") are left to the planner
+CALC_NOT_ARITHMETIC_PATTERN = re.compile(r'\b\d{1,4}([-/])\d{1,2}\1\d{1,4}\b|(?<![\d.])0\d|\d\s+\d')
+
+OUTLET_NORM_TABLE = str.maketrans('', '', ' –-')
+OUTLET_STOPWORDS = frozenset({'the', 'and', 'for', 'are', 'has', 'have'})
+HOURS_SPLIT_PATTERN = re.compile(r'\s*[-–]\s*')
+OPEN_PREFIX_PATTERN = re.compile(r'^(opens?|open\s+at|from)\s*', re.IGNORECASE)
+CLOSE_PREFIX_PATTERN = re.compile(r'^(closes?|close\s+at|until|to)\s*', re.IGNORECASE)
+
+MAX_DISPLAY_RESULTS = 20
+
+# Cap in-flight tool work so a burst of sessions can't flood the thread pool or DB
+TOOL_CONCURRENCY = 16
+_tool_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _tool_semaphore(tool: str) -> asyncio.Semaphore:
+    # Created inside the running loop: a semaphore binds to the first loop it waits on,
+    # and import time has no loop (tests and reloads may also start several)
+    semaphores = _tool_semaphores.setdefault(asyncio.get_running_loop(), {})
+    semaphore = semaphores.get(tool)
+    if semaphore is None:
+        semaphore = semaphores[tool] = asyncio.Semaphore(TOOL_CONCURRENCY)
+    return semaphore
+
 
 async def call_calculator(expression: str) -> Dict[str, Any]:
     try:
-        request = CalculatorRequest(expression=expression)
-        response = await calculate_endpoint(request)
+        result, error = calculate_expression(expression)
         
-        if response.result is not None:
-            return {"success": True, "result": response.result}
+        if result is not None:
+            return {"success": True, "result": result}
         else:
-            return {"success": False, "error": response.error or "Calculation failed"}
+            return {"success": False, "error": error or "Calculation failed"}
     except Exception as e:
-        logger.error(f"Error calling calculator: {e}")
+        logger.error("Error calling calculator: %s", e)
         return {"success": False, "error": str(e)}
 
 
 async def call_products(query: str) -> Dict[str, Any]:
     try:
-        response = await search_products_endpoint(query=query)
-        
-        result = {
-            "results": [
-                {
-                    "name": p.name,
-                    "description": p.description,
-                    "price": p.price,
-                    "url": p.url
-                }
-                for p in response.results
-            ],
-            "summary": response.summary
-        }
-        return {"success": True, "result": result}
+        async with _tool_semaphore("products"):
+            products, summary = await asyncio.to_thread(find_products, query)
+        return {"success": True, "result": {"results": products, "summary": summary}}
     except Exception as e:
-        logger.error(f"Error calling products: {e}")
+        logger.error("Error calling products: %s", e)
         return {"success": False, "error": str(e)}
 
 
 async def call_outlets(query: str) -> Dict[str, Any]:
     try:
-        response = await search_outlets_endpoint(query=query)
-        
-        result = {
-            "results": [
-                {
-                    "id": o.id,
-                    "name": o.name,
-                    "location": o.location,
-                    "district": o.district,
-                    "hours": o.hours,
-                    "services": o.services,
-                    "lat": o.lat,
-                    "lon": o.lon
-                }
-                for o in response.results
-            ],
-            "sql_query": response.sql_query
-        }
-        return {"success": True, "result": result}
+        if not query.strip():
+            return {"success": False, "error": "Query cannot be empty"}
+        async with _tool_semaphore("outlets"):
+            outlets, sql_query = await asyncio.to_thread(find_outlets, query)
+        return {"success": True, "result": {"results": outlets, "sql_query": sql_query}}
     except Exception as e:
-        logger.error(f"Error calling outlets: {e}")
+        logger.error("Error calling outlets: %s", e)
         return {"success": False, "error": str(e)}
 
 
@@ -96,15 +108,16 @@ def format_products_response(tool_result: Dict[str, Any]) -> str:
     if not results:
         return "I couldn't find any products matching your search."
     
-    response = f"I found {len(results)} product(s):\n"
-    for i, product in enumerate(results[:20], 1):
-        response += f"{i}. {product.get('name', 'Unknown')}"
-        if product.get("price"):
-            response += f" - {product.get('price')}"
-        response += "\n"
-    if len(results) > 20:
-        response += f"... and {len(results) - 20} more.\n"
-    return response.strip()
+    parts = [f"I found {len(results)} product(s):"]
+    for i, product in enumerate(results[:MAX_DISPLAY_RESULTS], 1):
+        price = product.get("price")
+        if price:
+            parts.append(f"{i}. {product.get('name', 'Unknown')} - {price}")
+        else:
+            parts.append(f"{i}. {product.get('name', 'Unknown')}")
+    if len(results) > MAX_DISPLAY_RESULTS:
+        parts.append(f"... and {len(results) - MAX_DISPLAY_RESULTS} more.")
+    return "\n".join(parts).strip()
 
 
 def format_outlets_response(tool_result: Dict[str, Any]) -> str:
@@ -120,202 +133,247 @@ def format_outlets_response(tool_result: Dict[str, Any]) -> str:
         outlet = results[0]
         return f"Yes! I found {outlet.get('name', 'Unknown')} at {outlet.get('location', 'Unknown')}. Hours: {outlet.get('hours', 'Not available')}"
     
-    MAX_DISPLAY = 20
-    response = f"Yes! I found {len(results)} outlet(s):\n"
-    for i, outlet in enumerate(results[:MAX_DISPLAY], 1):
+    parts = [f"Yes! I found {len(results)} outlet(s):\n"]
+    for i, outlet in enumerate(results[:MAX_DISPLAY_RESULTS], 1):
         name = outlet.get('name', 'Unknown')
         location = outlet.get('location', 'Unknown')
         if name == location or location in name:
-            response += f"{i}. {name}\n"
+            parts.append(f"{i}. {name}\n")
+        else:
+            parts.append(f"{i}. {name} - {location}\n")
+    if len(results) > MAX_DISPLAY_RESULTS:
+        parts.append(f"... and {len(results) - MAX_DISPLAY_RESULTS} more.\n")
+    return "".join(parts)
+
+
+async def _handle_calculator(memory: Dict[str, Any], slots: Dict[str, Any], message: str) -> Tuple[str, List[Dict[str, Any]], Dict[str, Any]]:
+    expression = slots.get("expression", message)
+    tool_result = await call_calculator(expression)
+    tool_calls = [{
+        "tool": "calculator",
+        "input": {"expression": expression},
+        "output": tool_result
+    }]
+    return format_calculator_response(tool_result), tool_calls, {}
+
+
+async def _handle_products(memory: Dict[str, Any], slots: Dict[str, Any], message: str) -> Tuple[str, List[Dict[str, Any]], Dict[str, Any]]:
+    query = slots.get("query", message)
+    tool_result = await call_products(query)
+    tool_calls = [{
+        "tool": "products",
+        "input": {"query": query},
+        "output": tool_result
+    }]
+    return format_products_response(tool_result), tool_calls, {}
+
+
+async def _handle_outlets(memory: Dict[str, Any], slots: Dict[str, Any], message: str) -> Tuple[str, List[Dict[str, Any]], Dict[str, Any]]:
+    query = slots.get("query", message)
+    followup = slots.get("followup")
+    logger.info("Outlet query: '%s', followup: '%s'", query, followup)
+    
+    tool_calls = []
+    context_updates: Dict[str, Any] = {}
+    
+    if followup in ["hours", "open_time", "close_time", "services", "location"]:
+        last_outlets_idx = memory["context"].get("_last_outlets_idx")
+        outlet_name = query
+        if '–' in outlet_name:
+            outlet_name = outlet_name.split('–')[-1].strip()
+        if '-' in outlet_name and 'zus' not in outlet_name.lower():
+            outlet_name = outlet_name.split('-')[-1].strip()
+        outlet_name = outlet_name.rstrip(',').strip()
+        outlet_lower = outlet_name.lower()
+        outlet_normalized = _normalize_outlet_text(outlet_lower)
+        
+        matched_outlet = _find_best_outlet_match(outlet_lower, outlet_normalized, last_outlets_idx) if last_outlets_idx else None
+        
+        if not matched_outlet:
+            tool_result = await call_outlets(outlet_name)
+            if tool_result.get("success") and tool_result.get("result", {}).get("results"):
+                outlets = tool_result["result"]["results"]
+                outlets_idx = _build_outlet_index(outlets)
+                matched_outlet = _find_best_outlet_match(outlet_lower, outlet_normalized, outlets_idx) or (outlets[0] if outlets else None)
+                if outlets:
+                    context_updates = _outlet_context(outlets, outlets_idx)
+        
+        if matched_outlet:
+            name = matched_outlet.get('name', outlet_name)
+            if followup == "hours":
+                hours = matched_outlet.get('hours', 'Not available')
+                response_text = f"Ah yes, the {name} opens at {hours}." if hours != 'Not available' else f"Sorry, I don't have the opening hours for {name}."
+            elif followup == "open_time":
+                hours = matched_outlet.get('hours', 'Not available')
+                if hours != 'Not available':
+                    opening_time = _extract_opening_time(hours)
+                    response_text = f"Ah yes, the {name} opens at {opening_time}." if opening_time else f"Ah yes, the {name} hours are {hours}."
+                else:
+                    response_text = f"Sorry, I don't have the opening time for {name}."
+            elif followup == "close_time":
+                hours = matched_outlet.get('hours', 'Not available')
+                if hours != 'Not available':
+                    closing_time = _extract_closing_time(hours)
+                    response_text = f"Ah yes, the {name} closes at {closing_time}." if closing_time else f"Ah yes, the {name} hours are {hours}."
+                else:
+                    response_text = f"Sorry, I don't have the closing time for {name}."
+            elif followup == "services":
+                services = matched_outlet.get('services', 'Not available')
+                if services and services != 'Not available':
+                    response_text = f"Yes, the {name} offers: {services}."
+                else:
+                    response_text = f"Sorry, I don't have service information for {name}."
+            elif followup == "location":
+                location = matched_outlet.get('location', 'Not available')
+                district = matched_outlet.get('district', '')
+                if location and location != 'Not available':
+                    if district and district != location:
+                        response_text = f"The {name} is located at {location}, {district}."
+                    else:
+                        response_text = f"The {name} is located at {location}."
+                else:
+                    response_text = f"Sorry, I don't have location information for {name}."
+            else:
+                response_text = f"I found information about {name}."
         else:
-            response += f"{i}. {name} - {location}\n"
-    if len(results) > MAX_DISPLAY:
-        response += f"... and {len(results) - MAX_DISPLAY} more.\n"
-    return response
+            response_text = f"Sorry, I couldn't find information about '{outlet_name}'."
+        
+        tool_calls.append({
+            "tool": "outlets",
+            "input": {"query": query, "followup": followup},
+            "output": {"success": True, "result": matched_outlet} if matched_outlet else {"success": False}
+        })
+    else:
+        tool_result = await call_outlets(query)
+        tool_calls.append({
+            "tool": "outlets",
+            "input": {"query": query},
+            "output": tool_result
+        })
+        response_text = format_outlets_response(tool_result)
+        
+        if tool_result.get("success") and tool_result.get("result", {}).get("results"):
+            outlets = tool_result["result"]["results"]
+            context_updates = _outlet_context(outlets, _build_outlet_index(outlets))
+            if len(outlets) > 1:
+                if len(outlets) > 20:
+                    response_text = response_text.rstrip() + "\n\nThere are many outlets. Please specify a location (e.g., 'outlets in Petaling Jaya') to narrow down the results."
+                else:
+                    response_text = response_text.rstrip() + "\n\nWhich outlet are you referring to?"
+    
+    return response_text, tool_calls, context_updates
+
+
+ACTION_HANDLERS = {
+    "call_calculator": _handle_calculator,
+    "call_products": _handle_products,
+    "call_outlets": _handle_outlets,
+}
+
 
+# Async providers resolve on the event loop; sync ones would cost a threadpool hop per request
+async def _planner_dependency() -> AgentPlanner:
+    return get_agent_planner()
 
-@router.post("", response_model=ChatResponse)
-async def chat(request: ChatRequest) -> ChatResponse:
+
+async def _memory_manager_dependency() -> MemoryManager:
+    return get_memory_manager()
+
+
+@router.post("", response_model=None, responses={200: {"model": ChatResponse}})
+async def chat(
+    request: ChatRequest,
+    planner: AgentPlanner = Depends(_planner_dependency),
+    memory_manager: MemoryManager = Depends(_memory_manager_dependency)
+) -> ORJSONResponse:
     try:
         session_id = "default"
         
-        planner = get_agent_planner()
-        memory_manager = get_memory_manager()
-        memory = memory_manager.get_memory(session_id)
-        user_message = ChatMessage(
-            role="user",
-            content=request.message,
-            timestamp=None
-        )
-        memory_manager.add_to_history(session_id, user_message)
+        memory = memory_manager.get_turn_context(session_id)
+        # Recorded before anything can fail, so resets, clarifications and errors all keep the user turn
+        memory_manager.commit_turn(session_id, [HistoryEntry(role="user", content=request.message)])
         
-        logger.info(f"Analyzing intent for: {request.message}")
-        intent_result = planner.analyze_intent(request.message, memory)
+        stripped_message = request.message.strip()
+        if (
+            CALC_FASTPATH_PATTERN.match(stripped_message)
+            and CALC_OPERATOR_PATTERN.search(stripped_message)
+            and not CALC_NOT_ARITHMETIC_PATTERN.search(stripped_message)
+        ):
+            intent_result = {
+                "intent": AgentPlanner.INTENT_CALCULATOR,
+                "confidence": 1.0,
+                "slots": {"expression": stripped_message},
+                "missing_slots": []
+            }
+        else:
+            logger.info("Analyzing intent for: %s", request.message)
+            if planner.llm is not None:
+                # Keep the event loop serving other sessions while the LLM call is in flight
+                intent_result = await asyncio.to_thread(planner.analyze_intent, request.message, memory)
+            else:
+                intent_result = planner.analyze_intent(request.message, memory)
         intent = intent_result.get("intent", AgentPlanner.INTENT_CHAT)
         slots = intent_result.get("slots", {})
         missing_slots = intent_result.get("missing_slots", [])
         
         if intent == AgentPlanner.INTENT_RESET:
             memory_manager.clear_memory(session_id)
-            return ChatResponse(
+            planner.clear_intent_cache()
+            return _chat_response(ChatResponse.model_construct(
                 response="I've cleared our conversation. How can I help you?",
                 tool_calls=None,
                 intent=intent,
                 memory=memory_manager.get_memory_summary(session_id)
-            )
+            ))
         
         action = planner.select_action(intent, slots, missing_slots)
-        logger.info(f"Selected action: {action} for intent: {intent}")
+        logger.info("Selected action: %s for intent: %s", action, intent)
         
         if action == "ask_clarification":
             clarification_msg = _get_clarification_message(intent, missing_slots)
-            return ChatResponse(
+            return _chat_response(ChatResponse.model_construct(
                 response=clarification_msg,
                 tool_calls=None,
                 intent=intent,
                 memory=memory_manager.get_memory_summary(session_id)
-            )
+            ))
         
         tool_calls = []
-        response_text = ""
-        
-        if action == "call_calculator":
-            expression = slots.get("expression", request.message)
-            tool_result = await call_calculator(expression)
-            tool_calls.append({
-                "tool": "calculator",
-                "input": {"expression": expression},
-                "output": tool_result
-            })
-            response_text = format_calculator_response(tool_result)
-            
-        elif action == "call_products":
-            query = slots.get("query", request.message)
-            tool_result = await call_products(query)
-            tool_calls.append({
-                "tool": "products",
-                "input": {"query": query},
-                "output": tool_result
-            })
-            response_text = format_products_response(tool_result)
-            
-        elif action == "call_outlets":
-            query = slots.get("query", request.message)
-            followup = slots.get("followup")
-            logger.info(f"Outlet query: '{query}', followup: '{followup}'")
-            
-            if followup in ["hours", "open_time", "close_time", "services", "location"]:
-                last_outlets = memory_manager.get_context(session_id, "last_outlets", [])
-                outlet_name = query
-                if '–' in outlet_name:
-                    outlet_name = outlet_name.split('–')[-1].strip()
-                if '-' in outlet_name and 'zus' not in outlet_name.lower():
-                    outlet_name = outlet_name.split('-')[-1].strip()
-                outlet_name = outlet_name.rstrip(',').strip()
-                
-                matched_outlet = _find_best_outlet_match(outlet_name, last_outlets) if last_outlets else None
-                
-                if not matched_outlet:
-                    tool_result = await call_outlets(outlet_name)
-                    if tool_result.get("success") and tool_result.get("result", {}).get("results"):
-                        outlets = tool_result["result"]["results"]
-                        matched_outlet = _find_best_outlet_match(outlet_name, outlets) or (outlets[0] if outlets else None)
-                        if outlets:
-                            memory_manager.update_context(session_id, "last_outlets", outlets)
-                
-                if matched_outlet:
-                    name = matched_outlet.get('name', outlet_name)
-                    if followup == "hours":
-                        hours = matched_outlet.get('hours', 'Not available')
-                        response_text = f"Ah yes, the {name} opens at {hours}." if hours != 'Not available' else f"Sorry, I don't have the opening hours for {name}."
-                    elif followup == "open_time":
-                        hours = matched_outlet.get('hours', 'Not available')
-                        if hours != 'Not available':
-                            opening_time = _extract_opening_time(hours)
-                            response_text = f"Ah yes, the {name} opens at {opening_time}." if opening_time else f"Ah yes, the {name} hours are {hours}."
-                        else:
-                            response_text = f"Sorry, I don't have the opening time for {name}."
-                    elif followup == "close_time":
-                        hours = matched_outlet.get('hours', 'Not available')
-                        if hours != 'Not available':
-                            closing_time = _extract_closing_time(hours)
-                            response_text = f"Ah yes, the {name} closes at {closing_time}." if closing_time else f"Ah yes, the {name} hours are {hours}."
-                        else:
-                            response_text = f"Sorry, I don't have the closing time for {name}."
-                    elif followup == "services":
-                        services = matched_outlet.get('services', 'Not available')
-                        if services and services != 'Not available':
-                            response_text = f"Yes, the {name} offers: {services}."
-                        else:
-                            response_text = f"Sorry, I don't have service information for {name}."
-                    elif followup == "location":
-                        location = matched_outlet.get('location', 'Not available')
-                        district = matched_outlet.get('district', '')
-                        if location and location != 'Not available':
-                            if district and district != location:
-                                response_text = f"The {name} is located at {location}, {district}."
-                            else:
-                                response_text = f"The {name} is located at {location}."
-                        else:
-                            response_text = f"Sorry, I don't have location information for {name}."
-                    else:
-                        response_text = f"I found information about {name}."
-                else:
-                    response_text = f"Sorry, I couldn't find information about '{outlet_name}'."
-                
-                tool_calls.append({
-                    "tool": "outlets",
-                    "input": {"query": query, "followup": followup},
-                    "output": {"success": True, "result": matched_outlet} if matched_outlet else {"success": False}
-                })
-            else:
-                tool_result = await call_outlets(query)
-                tool_calls.append({
-                    "tool": "outlets",
-                    "input": {"query": query},
-                    "output": tool_result
-                })
-                response_text = format_outlets_response(tool_result)
-                
-                if tool_result.get("success") and tool_result.get("result", {}).get("results"):
-                    outlets = tool_result["result"]["results"]
-                    memory_manager.update_context(session_id, "last_outlets", outlets)
-                    if len(outlets) > 1:
-                        if len(outlets) > 20:
-                            response_text = response_text.rstrip() + "\n\nThere are many outlets. Please specify a location (e.g., 'outlets in Petaling Jaya') to narrow down the results."
-                        else:
-                            response_text = response_text.rstrip() + "\n\nWhich outlet are you referring to?"
-            
+        context_updates = {}
+        handler = ACTION_HANDLERS.get(action)
+        if handler is not None:
+            response_text, tool_calls, context_updates = await handler(memory, slots, request.message)
         else:
-            response_text = _get_general_response(request.message, intent)
+            response_text = _get_general_response(request.message.lower(), intent)
         
-        assistant_message = ChatMessage(
-            role="assistant",
-            content=response_text,
-            timestamp=None
+        assistant_message = HistoryEntry(role="assistant", content=response_text)
+        memory_summary = memory_manager.commit_turn(
+            session_id, [assistant_message], slots, context_updates
         )
-        memory_manager.add_to_history(session_id, assistant_message)
         
-        for key, value in slots.items():
-            memory_manager.update_slot(session_id, key, value)
+        logger.info("Generated response for intent: %s", intent)
         
-        logger.info(f"Generated response for intent: {intent}")
-        
-        return ChatResponse(
+        return _chat_response(ChatResponse.model_construct(
             response=response_text,
             tool_calls=tool_calls if tool_calls else None,
             intent=intent,
-            memory=memory_manager.get_memory_summary(session_id)
-        )
+            memory=memory_summary
+        ))
         
     except Exception as e:
-        logger.error(f"Error in chat endpoint: {e}", exc_info=True)
+        logger.error("Error in chat endpoint: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail="An error occurred while processing your message"
         )
 
 
+def _chat_response(response: ChatResponse) -> ORJSONResponse:
+    # Fields are built in-process, so callers use model_construct to skip validation;
+    # dump in pydantic-core and let orjson write the bytes, skipping jsonable_encoder
+    return ORJSONResponse(response.model_dump())
+
+
 def _get_clarification_message(intent: str, missing_slots: List[str]) -> str:
     if intent == AgentPlanner.INTENT_CALCULATOR:
         return "What would you like me to calculate? Please provide a mathematical expression."
@@ -327,30 +385,56 @@ def _get_clarification_message(intent: str, missing_slots: List[str]) -> str:
         return "Could you please provide more details?"
 
 
-def _find_best_outlet_match(query: str, available_outlets: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
-    query_lower = query.lower().strip()
-    query_normalized = query_lower.replace(' ', '').replace('–', '').replace('-', '')
-    query_words = [w for w in query_lower.split() if len(w) > 2 and w not in ['the', 'and', 'for', 'are', 'has', 'have']]
+def _normalize_outlet_text(text: str) -> str:
+    return text.translate(OUTLET_NORM_TABLE)
+
+
+def _build_outlet_index(outlets: List[Dict[str, Any]]) -> Dict[str, Any]:
+    entries = []
+    by_name: Dict[str, Dict[str, Any]] = {}
+    by_norm: Dict[str, Dict[str, Any]] = {}
+    for outlet in outlets:
+        name = (outlet.get('name') or '').lower()
+        location = (outlet.get('location') or '').lower()
+        name_norm = _normalize_outlet_text(name)
+        entries.append({
+            "name": name,
+            "name_norm": name_norm,
+            "location": location,
+            "location_norm": _normalize_outlet_text(location),
+            "district": (outlet.get('district') or '').lower(),
+            "outlet": outlet
+        })
+        by_name.setdefault(name, outlet)
+        by_norm.setdefault(name_norm, outlet)
+    return {"entries": entries, "by_name": by_name, "by_norm": by_norm}
+
+
+def _outlet_context(outlets: List[Dict[str, Any]], outlets_idx: Dict[str, Any]) -> Dict[str, Any]:
+    # The index is private lookup state; underscore keys stay out of the memory summary
+    return {"last_outlets": outlets, "_last_outlets_idx": outlets_idx}
+
+
+def _find_best_outlet_match(query_lower: str, query_normalized: str, outlets_idx: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    exact = outlets_idx["by_name"].get(query_lower) or outlets_idx["by_norm"].get(query_normalized)
+    if exact is not None:
+        return exact
+    
+    query_words = [w for w in query_lower.split() if len(w) > 2 and w not in OUTLET_STOPWORDS]
     
     best_match = None
     best_score = 0
     
-    for outlet in available_outlets:
-        outlet_name = outlet.get('name', '').lower()
-        outlet_location = outlet.get('location', '').lower()
-        outlet_district = outlet.get('district', '').lower()
-        
-        # Normalize outlet names for comparison
-        outlet_name_normalized = outlet_name.replace(' ', '').replace('–', '').replace('-', '')
-        outlet_location_normalized = outlet_location.replace(' ', '').replace('–', '').replace('-', '')
+    for entry in outlets_idx["entries"]:
+        outlet_name = entry["name"]
+        outlet_location = entry["location"]
+        outlet_district = entry["district"]
         
         score = 0
         
-        if query_lower == outlet_name or query_normalized == outlet_name_normalized:
-            score = 100
-        elif query_lower in outlet_name or query_normalized in outlet_name_normalized:
+        if query_lower in outlet_name or query_normalized in entry["name_norm"]:
             score = 90
-        elif query_lower in outlet_location or query_normalized in outlet_location_normalized:
+        elif query_lower in outlet_location or query_normalized in entry["location_norm"]:
             score = 70
         elif query_lower in outlet_district:
             score = 60
@@ -362,42 +446,36 @@ def _find_best_outlet_match(query: str, available_outlets: List[Dict[str, Any]])
         
         if score > best_score:
             best_score = score
-            best_match = outlet
+            best_match = entry["outlet"]
     
     return best_match if best_score >= 20 else None
 
 
-def _extract_opening_time(hours: str) -> Optional[str]:
+def _split_hours(hours: str) -> Tuple[Optional[str], Optional[str]]:
     if not hours or hours == 'Not available':
-        return None
+        return None, None
     
-    parts = re.split(r'\s*[-–]\s*', hours.strip(), maxsplit=1)
-    if len(parts) >= 1:
-        opening = parts[0].strip()
-        opening = re.sub(r'^(opens?|open\s+at|from)\s*', '', opening, flags=re.IGNORECASE).strip()
-        return opening if opening else None
-    return None
+    parts = HOURS_SPLIT_PATTERN.split(hours.strip(), maxsplit=1)
+    opening = OPEN_PREFIX_PATTERN.sub('', parts[0].strip()).strip()
+    closing = CLOSE_PREFIX_PATTERN.sub('', parts[1].strip()).strip() if len(parts) >= 2 else ''
+    return opening or None, closing or None
+
+
+def _extract_opening_time(hours: str) -> Optional[str]:
+    return _split_hours(hours)[0]
 
 
 def _extract_closing_time(hours: str) -> Optional[str]:
-    if not hours or hours == 'Not available':
-        return None
-    
-    parts = re.split(r'\s*[-–]\s*', hours.strip(), maxsplit=1)
-    if len(parts) >= 2:
-        closing = parts[1].strip()
-        closing = re.sub(r'^(closes?|close\s+at|until|to)\s*', '', closing, flags=re.IGNORECASE).strip()
-        return closing if closing else None
-    return None
+    return _split_hours(hours)[1]
 
 
-def _get_general_response(message: str, intent: str) -> str:
-    message_lower = message.lower()
+def _get_general_response(message_lower: str, intent: str) -> str:
+    tokens = frozenset(WORD_PATTERN.findall(message_lower))
     
-    if any(word in message_lower for word in ['hello', 'hi', 'hey', 'greetings']):
+    if tokens & GREETING_WORDS:
         return "Hello! I'm here to help you with calculations, product searches, and finding outlets. What would you like to do?"
     
-    if any(word in message_lower for word in ['help', 'what can you do', 'capabilities']):
+    if tokens & HELP_WORDS or any(phrase in message_lower for phrase in HELP_PHRASES):
         return """I can help you with:
 - Mathematical calculations (e.g., "What's 2 + 2?")
 - Searching for products (e.g., "Show me tumblers")
@@ -1,53 +1,77 @@
 import logging
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Query, HTTPException, Request
+from fastapi.responses import ORJSONResponse, Response
+from typing import Optional, List, Dict, Any, Tuple
 
-from models.schemas import OutletsResponse, OutletResult
+from models.schemas import OutletsResponse
+from routers.serialization import compact_rows, conditional_response, ndjson_response
+from services.cache import TTLCache
 from services.text2sql_service import get_text2sql_service
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/outlets", tags=["outlets"])
 
+outlets_cache = TTLCache(maxsize=1024, ttl=300.0)
 
-@router.get("", response_model=OutletsResponse)
+
+def find_outlets(query: str) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    query = query.strip()
+    cache_key = query.lower()
+    cached = outlets_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    logger.info("Searching outlets with query: %s", query)
+    
+    text2sql_service = get_text2sql_service()
+    results, sql_query = text2sql_service.query(query)
+    
+    outlets = [
+        {
+            "id": result.get("id", 0),
+            "name": result.get("name", ""),
+            "location": result.get("location", ""),
+            "district": result.get("district"),
+            "hours": result.get("hours"),
+            "services": result.get("services"),
+            "lat": result.get("lat"),
+            "lon": result.get("lon")
+        }
+        for result in results
+    ]
+    
+    logger.info("Returning %s outlets", len(outlets))
+    outlets_cache.set(cache_key, (outlets, sql_query))
+    return outlets, sql_query
+
+
+@router.get("", response_model=None, responses={200: {"model": OutletsResponse}})
 async def search_outlets(
-    query: str = Query(..., min_length=1, description="Natural language query for outlets")
-) -> OutletsResponse:
+    request: Request,
+    query: str = Query(..., min_length=1, description="Natural language query for outlets"),
+    stream: bool = Query(default=False, description="Stream results as NDJSON, one outlet per line")
+) -> Response:
     try:
-        query = query.strip()
-        if not query:
+        if not query.strip():
             raise HTTPException(
                 status_code=400,
                 detail="Query cannot be empty"
             )
         
-        logger.info(f"Searching outlets with query: {query}")
+        outlets, sql_query = find_outlets(query)
+        if stream:
+            return ndjson_response(outlets)
         
-        text2sql_service = get_text2sql_service()
-        results, sql_query = text2sql_service.query(query)
+        response = ORJSONResponse({
+            "results": compact_rows(outlets),
+            "sql_query": sql_query
+        })
         
-        outlet_results = [
-            OutletResult(
-                id=result.get("id", 0),
-                name=result.get("name", ""),
-                location=result.get("location", ""),
-                district=result.get("district"),
-                hours=result.get("hours"),
-                services=result.get("services"),
-                lat=result.get("lat"),
-                lon=result.get("lon")
-            )
-            for result in results
-        ]
-        
-        logger.info(f"Returning {len(outlet_results)} outlets")
-        
-        return OutletsResponse(
-            results=outlet_results,
-            sql_query=sql_query
-        )
+        # Outlets can be rewritten by the scraper out of process, so hash the body itself
+        return conditional_response(request, response)
         
     except ValueError as e:
-        logger.warning(f"Invalid query detected: {e}")
+        logger.warning("Invalid query detected: %s", e)
         raise HTTPException(
             status_code=400,
             detail=f"Invalid query: {str(e)}"
@@ -55,7 +79,7 @@ async def search_outlets(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error searching outlets: {e}", exc_info=True)
+        logger.error("Error searching outlets: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail="An error occurred while searching outlets"
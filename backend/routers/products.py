@@ -1,98 +1,146 @@
+import json
 import logging
-from fastapi import APIRouter, Query, HTTPException
-from typing import Optional
+import re
+from functools import lru_cache
+from pathlib import Path
+from fastapi import APIRouter, Query, HTTPException, Request
+from fastapi.responses import ORJSONResponse, Response
+from typing import Optional, List, Dict, Any, Tuple
 
-from models.schemas import ProductsResponse, ProductResult
+from models.schemas import ProductsResponse
+from routers.serialization import compact_rows, conditional_response, ndjson_response
+from services.cache import TTLCache
 from services.rag_service import get_rag_service
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/products", tags=["products"])
 
+products_cache = TTLCache(maxsize=1024, ttl=300.0)
 
-@router.get("", response_model=ProductsResponse)
+ALL_PRODUCTS_QUERIES = frozenset({'all products', 'all', 'show all', 'list all', 'products', '/products'})
+SPECIFIC_PRODUCT_KEYWORDS = ('og cup', 'all day cup', 'all-can', 'frozee', 'og ceramic')
+# Priority order with substring semantics, so plurals ("tumblers", "cups") match
+# their singular entry; categories are lowercased to match _load_products_by_category()
+CATEGORY_KEYWORDS = (
+    ('tumbler', 'tumbler'), ('cup', 'tumbler'), ('mug', 'mugs'),
+    ('accessories', 'accessories'), ('collectibles', 'collectibles'),
+)
+# One pass over the query finds every keyword; the lookahead lets overlapping
+# hits ("og cup" and "cup") both be reported
+PRODUCT_KEYWORD_PATTERN = re.compile(
+    "(?=(" + "|".join(map(re.escape, SPECIFIC_PRODUCT_KEYWORDS + tuple(kw for kw, _ in CATEGORY_KEYWORDS))) + "))"
+)
+SPECIFIC_PRODUCT_SET = frozenset(SPECIFIC_PRODUCT_KEYWORDS)
+
+
+@lru_cache(maxsize=1024)
+def _classify_query(query_lower: str) -> Tuple[int, Optional[str]]:
+    """Return the default top_k and the fallback catalogue category for a query."""
+    hits = frozenset(PRODUCT_KEYWORD_PATTERN.findall(query_lower))
+    category = next((cat for kw, cat in CATEGORY_KEYWORDS if kw in hits), None)
+    # Specific products win over categories: "og cup" must not widen to 25
+    if not query_lower or query_lower in ALL_PRODUCTS_QUERIES:
+        top_k = 50
+    elif hits & SPECIFIC_PRODUCT_SET:
+        top_k = 5
+    elif category is not None:
+        top_k = 25
+    else:
+        top_k = 5
+    return top_k, category
+
+
+def _products_by_category() -> Dict[str, List[Dict[str, Any]]]:
+    products_path = Path("data/products/products.json")
+    if not products_path.exists():
+        products_path = Path(__file__).parent.parent / "data" / "products" / "products.json"
+    if not products_path.exists():
+        return {}
+    # Keyed on mtime so a re-scraped catalogue is picked up without a restart
+    return _load_products_by_category(str(products_path), products_path.stat().st_mtime_ns)
+
+
+@lru_cache(maxsize=1)
+def _load_products_by_category(products_path: str, mtime_ns: int) -> Dict[str, List[Dict[str, Any]]]:
+    with open(products_path, 'r', encoding='utf-8') as f:
+        all_products = json.load(f)
+    by_category: Dict[str, List[Dict[str, Any]]] = {}
+    for p in all_products:
+        by_category.setdefault((p.get('category') or '').lower(), []).append(
+            {"name": p.get("name", ""), "description": p.get("description", ""),
+             "price": p.get("price"), "url": p.get("url")}
+        )
+    return by_category
+
+
+def find_products(query: str, top_k: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    query = query.strip()
+    if not query:
+        query = "products"
+    query_lower = query.lower()
+    
+    logger.info("Searching products with query: %s", query)
+    
+    default_top_k, category = _classify_query(query_lower)
+    if top_k is None:
+        top_k = default_top_k
+    
+    cache_key = (query_lower, top_k)
+    cached = products_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    rag_service = get_rag_service()
+    results = rag_service.search(query, top_k=top_k)
+    
+    products = [
+        {
+            "name": result.get("name", ""),
+            "description": result.get("description", ""),
+            "price": result.get("price"),
+            "url": result.get("url")
+        }
+        for result in results
+    ]
+    
+    if not products:
+        if category:
+            # Catalogue entries are stored result-shaped, so no per-item copy is needed
+            products = _products_by_category().get(category, [])[:top_k]
+    
+    summary = None
+    if products:
+        summary = f"Found {len(products)} product(s): " + ", ".join(p["name"] for p in products)
+    
+    logger.info("Returning %s products", len(products))
+    products_cache.set(cache_key, (products, summary))
+    return products, summary
+
+
+@router.get("", response_model=None, responses={200: {"model": ProductsResponse}})
 async def search_products(
+    request: Request,
     query: str = Query(..., min_length=1, description="Search query for products"),
-    top_k: Optional[int] = Query(default=None, description="Number of results to return")
-) -> ProductsResponse:
+    top_k: Optional[int] = Query(default=None, ge=1, le=100, description="Number of results to return"),
+    stream: bool = Query(default=False, description="Stream results as NDJSON, one product per line")
+) -> Response:
     try:
-        query = query.strip()
-        if not query:
-            query = "products"
-        
-        logger.info(f"Searching products with query: {query}")
-        
-        if top_k is not None:
-            try:
-                top_k = int(top_k)
-            except (ValueError, TypeError):
-                top_k = None
+        products, summary = find_products(query, top_k)
+        if stream:
+            return ndjson_response(products)
         
-        if top_k is None:
-            query_lower = query.lower().strip()
-            if not query_lower or query_lower in ['all products', 'all', 'show all', 'list all', 'products', '/products']:
-                top_k = 50
-            elif any(specific in query_lower for specific in ['og cup', 'all day cup', 'all-can', 'frozee', 'og ceramic']):
-                top_k = 5
-            elif any(keyword in query_lower for keyword in ['tumbler', 'tumblers', 'mug', 'mugs', 'cup', 'cups', 
-                                                           'accessories', 'collectibles']):
-                top_k = 25
-            else:
-                top_k = 5
-        
-        top_k = int(top_k)
-        
-        rag_service = get_rag_service()
-        results = rag_service.search(query, top_k=top_k)
+        response = ORJSONResponse({
+            "results": compact_rows(products),
+            "summary": summary
+        })
         
-        if not results:
-            query_lower = query.lower().strip()
-            category_map = {
-                'tumbler': 'Tumbler', 'tumblers': 'Tumbler', 'cup': 'Tumbler', 'cups': 'Tumbler',
-                'mug': 'Mugs', 'mugs': 'Mugs',
-                'accessories': 'Accessories', 'collectibles': 'Collectibles'
-            }
-            
-            category = next((cat for kw, cat in category_map.items() if kw in query_lower), None)
-            if category:
-                import json
-                from pathlib import Path
-                products_path = Path("data/products/products.json")
-                if not products_path.exists():
-                    products_path = Path(__file__).parent.parent / "data" / "products" / "products.json"
-                if products_path.exists():
-                    with open(products_path, 'r', encoding='utf-8') as f:
-                        all_products = json.load(f)
-                    category_products = [p for p in all_products if p.get('category') == category][:top_k]
-                    results = [{"name": p.get("name", ""), "description": p.get("description", ""), 
-                               "price": p.get("price"), "url": p.get("url"), "score": 1.0} 
-                              for p in category_products]
-        
-        product_results = [
-            ProductResult(
-                name=result.get("name", ""),
-                description=result.get("description", ""),
-                price=result.get("price"),
-                url=result.get("url")
-            )
-            for result in results
-        ]
-        
-        summary = None
-        if product_results:
-            product_names = [p.name for p in product_results]
-            summary = f"Found {len(product_results)} product(s): {', '.join(product_names)}"
-        
-        logger.info(f"Returning {len(product_results)} products")
-        
-        return ProductsResponse(
-            results=product_results,
-            summary=summary
-        )
+        # Results depend on the index and products.json on disk, so hash the body itself
+        return conditional_response(request, response)
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error searching products: {e}", exc_info=True)
+        logger.error("Error searching products: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail="An error occurred while searching products"
@@ -105,12 +153,14 @@ async def rebuild_index() -> dict:
         logger.info("Rebuilding product index")
         rag_service = get_rag_service()
         rag_service.rebuild_index()
+        products_cache.clear()
+        _load_products_by_category.cache_clear()
         return {
             "status": "success",
             "message": "Index rebuilt successfully"
         }
     except Exception as e:
-        logger.error(f"Error rebuilding index: {e}", exc_info=True)
+        logger.error("Error rebuilding index: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail="An error occurred while rebuilding the index"
@@ -0,0 +1,48 @@
+import hashlib
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import orjson
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+# Entity tags in an If-None-Match list; quoted tags may themselves contain commas
+ENTITY_TAG_PATTERN = re.compile(r'(?:W/)?"[^"]*"')
+
+
+def compact(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in row.items() if value is not None}
+
+
+def compact_rows(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Result rows come from our own services, so they are dumped without re-validation."""
+    return [compact(row) for row in rows]
+
+
+def _iter_ndjson(rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    for row in rows:
+        yield orjson.dumps(compact(row)) + b"\n"
+
+
+def ndjson_response(rows: Iterable[Dict[str, Any]]) -> StreamingResponse:
+    """One JSON object per line, null fields omitted as in the buffered responses."""
+    return StreamingResponse(_iter_ndjson(rows), media_type="application/x-ndjson")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check per RFC 9110: "*" or any listed tag, compared weakly."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque_tag = etag.removeprefix("W/")
+    return any(tag.removeprefix("W/") == opaque_tag for tag in ENTITY_TAG_PATTERN.findall(if_none_match))
+
+
+def conditional_response(request: Request, response: Response) -> Response:
+    """Tag a buffered response with a hash of its body, answering 304 when the client already has it."""
+    etag = f'"{hashlib.blake2b(response.body, digest_size=8).hexdigest()}"'
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return response
@@ -0,0 +1,155 @@
+"""
+Shared HTTP plumbing for the scrapers: one keep-alive session and an on-disk
+page cache revalidated with conditional GETs.
+"""
+import os
+import hashlib
+import json
+import logging
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Headers to mimic a browser request
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+    # Adds br (and zstd) only when a decoder is installed, so bodies always decompress
+    "Accept-Encoding": ACCEPT_ENCODING,
+    "Connection": "keep-alive",
+}
+
+# Page bodies plus {fetched_at, etag, last_modified}; SCRAPE_FORCE_REFRESH=1 bypasses them
+HTTP_CACHE_DIR = Path(__file__).parent.parent / "data" / "http_cache"
+
+
+def create_session() -> requests.Session:
+    """Build a keep-alive session so every request after the first reuses the TLS connection."""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=20,
+        max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+# Shared by all fetches in a scraper run
+session = create_session()
+
+
+class _TeeReader:
+    """File-like view of a response stream that copies every chunk it hands out into `sink`."""
+
+    def __init__(self, raw, sink: BinaryIO):
+        self._raw = raw
+        self._sink = sink
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        chunk = self._raw.read(None if size is None or size < 0 else size)
+        self._sink.write(chunk)
+        return chunk
+
+
+def _write_meta(meta_path: Path, meta: Dict[str, Any], url: str) -> None:
+    try:
+        HTTP_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        meta_path.write_text(json.dumps(meta))
+    except OSError as e:
+        logger.warning(f"Could not cache {url}: {e}")
+
+
+@contextmanager
+def open_page(url: str, max_age: float = 0) -> Iterator[Tuple[BinaryIO, bool]]:
+    """
+    Open a page through the on-disk cache as a readable stream.
+
+    A cached copy younger than `max_age` seconds is served without a request.
+    Older copies are revalidated with If-None-Match/If-Modified-Since, and a 304
+    serves the stored body. A changed page is streamed (decompressed) from the
+    socket while being copied into the cache, so it is never buffered whole.
+
+    Args:
+        url: Full URL to fetch
+        max_age: Seconds a cached copy is trusted without revalidation
+
+    Yields:
+        (body, modified): a binary file-like body, and False when the cached copy was reused
+    """
+    cache_key = hashlib.sha1(url.encode()).hexdigest()
+    body_path = HTTP_CACHE_DIR / f"{cache_key}.html"
+    meta_path = HTTP_CACHE_DIR / f"{cache_key}.json"
+
+    # Merged over the session's default HEADERS
+    headers = {}
+    meta = {}
+    if not os.getenv("SCRAPE_FORCE_REFRESH") and body_path.exists() and meta_path.exists():
+        meta = json.loads(meta_path.read_text())
+        if time.time() - meta.get('fetched_at', 0) < max_age:
+            logger.debug(f"Using cached copy of {url}")
+            with body_path.open('rb') as body:
+                yield body, False
+            return
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+    with session.get(url, headers=headers, timeout=10, stream=True) as response:
+        if response.status_code == 304:
+            logger.info(f"Unchanged since last scrape: {url}")
+            meta['fetched_at'] = time.time()
+            _write_meta(meta_path, meta, url)
+            with body_path.open('rb') as body:
+                yield body, False
+            return
+
+        response.raise_for_status()
+        response.raw.decode_content = True
+        meta = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        }
+
+        partial_path = body_path.with_suffix('.part')
+        try:
+            HTTP_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            sink = partial_path.open('wb')
+        except OSError as e:
+            logger.warning(f"Could not cache {url}: {e}")
+            yield response.raw, True
+            return
+
+        try:
+            with sink:
+                reader = _TeeReader(response.raw, sink)
+                yield reader, True
+                # Whatever the caller left unread still belongs in the cached copy
+                reader.read()
+            partial_path.replace(body_path)
+        except OSError as e:
+            logger.warning(f"Could not cache {url}: {e}")
+            return
+        finally:
+            partial_path.unlink(missing_ok=True)
+
+    meta['fetched_at'] = time.time()
+    _write_meta(meta_path, meta, url)
+
+
+def fetch_page(url: str, max_age: float = 0) -> bytes:
+    """Return the whole (decompressed) body of a page; see `open_page` for the caching rules."""
+    with open_page(url, max_age) as (body, _):
+        return body.read()
@@ -9,6 +9,7 @@ from pathlib import Path
 from typing import List, Dict, Any, Set
 import time
 import re
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin
 
 try:
@@ -19,10 +20,20 @@ except ImportError:
     print("  pip install requests beautifulsoup4")
     sys.exit(1)
 
+# libxml2-backed parsing is several times faster; fall back to the stdlib parser
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from models.database import SessionLocal, Outlet, init_db
+from sqlalchemy import func, select
+
+from models.database import SessionLocal, outlets_table, bulk_insert_outlets, init_db
+from scripts.http_cache import open_page
 
 # Configure logging
 logging.basicConfig(
@@ -35,18 +46,50 @@ logger = logging.getLogger(__name__)
 BASE_URL = "https://zuscoffee.com"
 OUTLETS_BASE_URL = f"{BASE_URL}/category/store/"
 
-# Headers to mimic a browser request
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-    "Accept-Language": "en-US,en;q=0.5",
-    "Accept-Encoding": "gzip, deflate",
-    "Connection": "keep-alive",
-}
-
 # Maximum pages to scrape (safety limit - website shows up to Page 22)
 MAX_PAGES_PER_REGION = 25
 
+# Pages fetched in parallel, each worker pausing REQUEST_DELAY seconds between pages
+MAX_CONCURRENT_FETCHES = 4
+REQUEST_DELAY = 1.0
+
+PAGE_NUMBER_PATTERN = re.compile(r'/page/(\d+)', re.I)
+NEXT_LINK_PATTERN = re.compile(r'next', re.I)
+
+# Address heuristics: any of these keywords, or a 5-digit postal code
+ADDRESS_KEYWORD_PATTERN = re.compile(
+    r'jalan|street|road|mall|centre|center|plaza|selangor|kuala lumpur|floor|lot|no|ground'
+)
+POSTAL_CODE_PATTERN = re.compile(r'\d{5}')
+
+# Common districts in KL/Selangor only, in priority order
+DISTRICTS = (
+    "Petaling Jaya", "Kuala Lumpur", "Subang Jaya", "Klang", "Shah Alam",
+    "Ampang", "Cheras", "Bangsar", "Mont Kiara", "Damansara", "Puchong",
+    "Kepong", "Setapak", "Wangsa Maju", "Gombak", "Selayang", "SS 2",
+    "SS2", "1 Utama", "One Utama", "Bandar Utama", "PJ", "Putrajaya",
+    "Cyberjaya", "Seri Kembangan", "Kajang", "Rawang", "Port Klang",
+    "Bangi", "Sepang", "Elmina", "Bandar Baru Bangi"
+)
+DISTRICT_RANK = {district.lower(): rank for rank, district in enumerate(DISTRICTS)}
+# Lookahead so overlapping mentions ("Port Klang" and "Klang") are all reported
+DISTRICT_PATTERN = re.compile("(?=(" + "|".join(re.escape(d) for d in DISTRICT_RANK) + "))")
+
+
+def resolve_url(href: str, base_url: str) -> str:
+    """Resolve a possibly relative link against the site root or the current page."""
+    if href.startswith('/'):
+        return BASE_URL + href
+    if href.startswith('http'):
+        return href
+    return urljoin(base_url, href)
+
+
+def fetch_page_soup(url: str) -> BeautifulSoup:
+    """Parse a page straight from the (decompressed) stream; listing pages are always revalidated."""
+    with open_page(url) as (body, _):
+        return BeautifulSoup(body, HTML_PARSER)
+
 
 def find_pagination_links(soup: BeautifulSoup, base_url: str) -> List[str]:
     """
@@ -59,89 +102,43 @@ def find_pagination_links(soup: BeautifulSoup, base_url: str) -> List[str]:
         base_url: Base URL for resolving relative links
         
     Returns:
-        List of pagination URLs
+        List of pagination URLs, in page order
     """
-    pagination_urls = []
+    # Keyed by page number, so each page appears once and ordering needs no regex re-scan
+    urls_by_page: Dict[int, str] = {}
     max_page_num = 0
     
-    # Find all links with class "page-numbers"
-    page_links = soup.find_all('a', class_=lambda x: x and 'page-numbers' in x)
-    
-    for link in page_links:
+    # One pass over the "page-numbers" links; the "Next" link carries the same class
+    for link in soup.select('a.page-numbers'):
         href = link.get('href', '')
-        text = link.get_text(strip=True).lower()
         
         # Skip "Previous" text links
-        if text == 'previous':
+        if link.get_text(strip=True).lower() == 'previous':
             continue
         
-        # Check if it's a pagination link with /page/ in URL
-        if '/page/' in href.lower():
-            # Extract page number
-            page_match = re.search(r'/page/(\d+)', href, re.I)
-            if page_match:
-                page_num = int(page_match.group(1))
-                max_page_num = max(max_page_num, page_num)
-            
-            # Resolve relative URLs
-            if href.startswith('/'):
-                full_url = BASE_URL + href
-            elif href.startswith('http'):
-                full_url = href
-            else:
-                full_url = urljoin(base_url, href)
-            
-            # Only include if it's a different page and for KL/Selangor
-            if full_url not in pagination_urls and full_url != base_url:
-                if 'kuala-lumpur-selangor' in full_url.lower():
-                    pagination_urls.append(full_url)
-    
-    # Also check for "Next" link specifically
-    next_link = soup.find('a', class_=lambda x: x and 'page-numbers' in x and 'next' in x)
-    if next_link and next_link.get('href'):
-        href = next_link.get('href')
-        if href.startswith('/'):
-            full_url = BASE_URL + href
-        elif href.startswith('http'):
-            full_url = href
-        else:
-            full_url = urljoin(base_url, href)
+        page_match = PAGE_NUMBER_PATTERN.search(href)
+        if not page_match:
+            continue
+        page_num = int(page_match.group(1))
+        max_page_num = max(max_page_num, page_num)
         
-        if full_url not in pagination_urls and full_url != base_url:
-            if 'kuala-lumpur-selangor' in full_url.lower():
-                pagination_urls.append(full_url)
-                # Extract page number from next link
-                page_match = re.search(r'/page/(\d+)', href, re.I)
-                if page_match:
-                    max_page_num = max(max_page_num, int(page_match.group(1)))
+        # Only include if it's a different page and for KL/Selangor
+        full_url = resolve_url(href, base_url)
+        if full_url != base_url and 'kuala-lumpur-selangor' in full_url.lower():
+            urls_by_page.setdefault(page_num, full_url)
     
     # If we found a max page number, generate all page URLs up to that number
     # This handles cases where pagination shows "Page1 Page2 Page3 … Page22"
-    if max_page_num > 0:
-        base_path = '/category/store/kuala-lumpur-selangor'
-        for page_num in range(2, min(max_page_num + 1, MAX_PAGES_PER_REGION + 1)):
-            page_url = f"{BASE_URL}{base_path}/page/{page_num}/"
-            if page_url not in pagination_urls:
-                pagination_urls.append(page_url)
-    
-    # Sort URLs to process pages in order
-    def extract_page_num(url):
-        match = re.search(r'/page/(\d+)', url, re.I)
-        return int(match.group(1)) if match else 0
-    
-    pagination_urls.sort(key=extract_page_num)
+    base_path = '/category/store/kuala-lumpur-selangor'
+    for page_num in range(2, min(max_page_num + 1, MAX_PAGES_PER_REGION + 1)):
+        urls_by_page.setdefault(page_num, f"{BASE_URL}{base_path}/page/{page_num}/")
     
-    # Remove duplicates while preserving order
-    seen = set()
-    unique_urls = []
-    for url in pagination_urls:
-        if url not in seen:
-            seen.add(url)
-            unique_urls.append(url)
-    
-    return unique_urls[:MAX_PAGES_PER_REGION]  # Limit pages
+    return [urls_by_page[page_num] for page_num in sorted(urls_by_page)][:MAX_PAGES_PER_REGION]
 
 
+def looks_like_address(text_lower: str) -> bool:
+    """Check whether an already-lowercased paragraph reads like a street address."""
+    return bool(ADDRESS_KEYWORD_PATTERN.search(text_lower) or POSTAL_CODE_PATTERN.search(text_lower))
 
 
 def parse_location(location_text: str) -> tuple[str, str]:
@@ -156,21 +153,9 @@ def parse_location(location_text: str) -> tuple[str, str]:
     """
     location_text = location_text.strip()
     
-    # Common districts in KL/Selangor only
-    districts = [
-        "Petaling Jaya", "Kuala Lumpur", "Subang Jaya", "Klang", "Shah Alam",
-        "Ampang", "Cheras", "Bangsar", "Mont Kiara", "Damansara", "Puchong",
-        "Kepong", "Setapak", "Wangsa Maju", "Gombak", "Selayang", "SS 2",
-        "SS2", "1 Utama", "One Utama", "Bandar Utama", "PJ", "Putrajaya",
-        "Cyberjaya", "Seri Kembangan", "Kajang", "Rawang", "Port Klang",
-        "Bangi", "Sepang", "Elmina", "Bandar Baru Bangi"
-    ]
-    
-    district = None
-    for d in districts:
-        if d.lower() in location_text.lower():
-            district = d
-            break
+    # Every district mentioned is found in one scan; the earliest-listed one wins
+    hits = DISTRICT_PATTERN.findall(location_text.lower())
+    district = DISTRICTS[min(DISTRICT_RANK[hit] for hit in hits)] if hits else None
     
     return location_text, district or "Kuala Lumpur"
 
@@ -194,19 +179,19 @@ def extract_outlets_from_page(soup: BeautifulSoup, page_url: str) -> List[Dict[s
     
     # Find all outlet containers - look for elementor sections with outlet data
     # Each outlet is in a div with data-elementor-type="loop"
-    outlet_containers = soup.find_all('div', {'data-elementor-type': 'loop'})
+    outlet_containers = soup.select('div[data-elementor-type="loop"]')
     
     if not outlet_containers:
         # Fallback: look for elementor sections that contain outlet info
-        outlet_containers = soup.find_all('section', class_=lambda x: x and 'elementor-section' in x)
+        outlet_containers = soup.select('section[class*="elementor-section"]')
     
     for container in outlet_containers:
         try:
             # Find outlet name - look for elementor-heading-title with "ZUS Coffee"
-            name_elem = container.find('p', class_=lambda x: x and 'elementor-heading-title' in x)
+            name_elem = container.select_one('p[class*="elementor-heading-title"]')
             if not name_elem:
                 # Try h2/h3 with elementor-heading-title
-                name_elem = container.find(['h2', 'h3'], class_=lambda x: x and 'elementor-heading-title' in x)
+                name_elem = container.select_one('h2[class*="elementor-heading-title"], h3[class*="elementor-heading-title"]')
             
             if not name_elem:
                 continue
@@ -223,7 +208,7 @@ def extract_outlets_from_page(soup: BeautifulSoup, page_url: str) -> List[Dict[s
             location_text = ""
             
             # Method 1: Look for theme-post-content widget
-            post_content = container.find('div', class_=lambda x: x and 'theme-post-content' in str(x))
+            post_content = container.select_one('div[class*="theme-post-content"]')
             if post_content:
                 # Find paragraph with address (contains location keywords or postal code)
                 paragraphs = post_content.find_all('p')
@@ -233,25 +218,19 @@ def extract_outlets_from_page(soup: BeautifulSoup, page_url: str) -> List[Dict[s
                     if 'entry-title' in str(p.parent):
                         continue
                     # Check if it looks like an address
-                    if any(keyword in text.lower() for keyword in [
-                        'jalan', 'street', 'road', 'mall', 'centre', 'center', 
-                        'plaza', 'selangor', 'kuala lumpur', 'floor', 'lot', 'no', 'ground'
-                    ]) or re.search(r'\d{5}', text):  # Contains postal code pattern
+                    if looks_like_address(text.lower()):
                         location_text = text
                         break
             
             # Method 2: If no address found, look for paragraph after location heading
             if not location_text:
-                location_heading = container.find('h2', class_=lambda x: x and 'location' in str(x))
+                location_heading = container.select_one('h2[class*="location"]')
                 if location_heading:
                     # Find next paragraph after location heading
                     next_elem = location_heading.find_next('p')
                     if next_elem:
                         text = next_elem.get_text(strip=True)
-                        if any(keyword in text.lower() for keyword in [
-                            'jalan', 'street', 'road', 'mall', 'centre', 'center',
-                            'plaza', 'selangor', 'kuala lumpur', 'floor', 'lot', 'no'
-                        ]) or re.search(r'\d{5}', text):
+                        if looks_like_address(text.lower()):
                             location_text = text
             
             # Method 3: Look for any paragraph in the container with address-like content
@@ -259,16 +238,14 @@ def extract_outlets_from_page(soup: BeautifulSoup, page_url: str) -> List[Dict[s
                 all_paragraphs = container.find_all('p')
                 for p in all_paragraphs:
                     text = p.get_text(strip=True)
+                    text_lower = text.lower()
                     # Skip if it's the outlet name or entry-title
-                    if 'zus coffee' in text.lower() and len(text) < 100:
+                    if 'zus coffee' in text_lower and len(text) < 100:
                         continue
                     if 'entry-title' in str(p.parent):
                         continue
                     # Check if it looks like an address
-                    if any(keyword in text.lower() for keyword in [
-                        'jalan', 'street', 'road', 'mall', 'centre', 'center',
-                        'plaza', 'selangor', 'kuala lumpur', 'floor', 'lot', 'no', 'ground'
-                    ]) or re.search(r'\d{5}', text):
+                    if looks_like_address(text_lower):
                         location_text = text
                         break
             
@@ -323,75 +300,65 @@ def scrape_outlets() -> List[Dict[str, Any]]:
     
     # Start with KL/Selangor page 1
     base_url = f"{BASE_URL}/category/store/kuala-lumpur-selangor/"
-    page_urls = [base_url]
+    # Insertion-ordered set of page URLs
+    page_urls: Dict[str, None] = {base_url: None}
     
     try:
         # Start with page 1
         logger.info(f"Fetching initial page: {base_url}")
-        response = requests.get(base_url, headers=HEADERS, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = fetch_page_soup(base_url)
         
         # Find all pagination links
         pagination_urls = find_pagination_links(soup, base_url)
         logger.info(f"Found {len(pagination_urls)} pagination pages")
         
-        # Add all pagination URLs to the list
-        for pag_url in pagination_urls:
-            if pag_url not in page_urls:
-                page_urls.append(pag_url)
+        # Add all pagination URLs, skipping ones already queued
+        page_urls.update(dict.fromkeys(pagination_urls))
         
         # Also check for "Next" link to find additional pages
-        next_link = soup.find('a', string=re.compile(r'next', re.I))
+        next_link = soup.find('a', string=NEXT_LINK_PATTERN)
         if next_link and next_link.get('href'):
-            next_href = next_link.get('href')
-            if next_href.startswith('/'):
-                next_url = BASE_URL + next_href
-            elif next_href.startswith('http'):
-                next_url = next_href
-            else:
-                next_url = urljoin(base_url, next_href)
+            next_url = resolve_url(next_link.get('href'), base_url)
             
-            if next_url not in page_urls and 'kuala-lumpur-selangor' in next_url.lower():
-                page_urls.append(next_url)
+            if 'kuala-lumpur-selangor' in next_url.lower():
+                page_urls[next_url] = None
         
         logger.info(f"Total pages to scrape: {len(page_urls)}")
         
-        # Scrape each page
-        for page_num, page_url in enumerate(page_urls, 1):
-            if page_url in visited_urls:
-                continue
-            
-            visited_urls.add(page_url)
-            
+        # Page 1 is already parsed; the rest are fetched concurrently, results kept in page order
+        visited_urls.add(base_url)
+        remaining_urls = [url for url in page_urls if url not in visited_urls]
+        visited_urls.update(remaining_urls)
+        total_pages = len(page_urls)
+        
+        def scrape_page(numbered_url) -> List[Dict[str, Any]]:
+            page_num, page_url = numbered_url
             try:
-                logger.info(f"Scraping page {page_num}/{len(page_urls)}: {page_url}")
-                response = requests.get(page_url, headers=HEADERS, timeout=10)
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Extract outlets from this page
-                page_outlets = extract_outlets_from_page(soup, page_url)
-                
-                for outlet in page_outlets:
-                    # Avoid duplicates by name
-                    outlet_key = outlet['name'].lower().strip()
-                    if outlet_key not in seen_outlets:
-                        seen_outlets.add(outlet_key)
-                        all_outlets.append(outlet)
-                        logger.info(f"  ✓ Added: {outlet['name']}")
-                
-                # Be respectful with requests
-                time.sleep(1)
-                
+                logger.info(f"Scraping page {page_num}/{total_pages}: {page_url}")
+                page_soup = fetch_page_soup(page_url)
+                return extract_outlets_from_page(page_soup, page_url)
             except requests.RequestException as e:
                 logger.warning(f"Error fetching page {page_url}: {e}")
-                continue
+                return []
             except Exception as e:
                 logger.warning(f"Error processing page {page_url}: {e}")
-                continue
+                return []
+            finally:
+                # Be respectful with requests: each worker still pauses between pages
+                time.sleep(REQUEST_DELAY)
+        
+        pages = [extract_outlets_from_page(soup, base_url)]
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_FETCHES) as executor:
+            pages.extend(executor.map(scrape_page, enumerate(remaining_urls, 2)))
+        
+        for page_outlets in pages:
+            for outlet in page_outlets:
+                # Avoid duplicates by name
+                outlet_key = outlet['name'].lower().strip()
+                if outlet_key not in seen_outlets:
+                    seen_outlets.add(outlet_key)
+                    all_outlets.append(outlet)
+                    logger.info(f"  ✓ Added: {outlet['name']}")
         
         if not all_outlets:
             logger.warning("No outlets scraped.")
@@ -423,35 +390,15 @@ def save_outlets_with_retry(outlets_data: List[Dict[str, Any]], max_retries: int
         try:
             db = SessionLocal()
             
-            # Fetch existing outlet names to avoid duplicate checks
-            existing_outlet_names = {o.name for o in db.query(Outlet.name).all()}
-
-            new_outlets = []
-            for outlet_data in outlets_data:
-                if outlet_data['name'] not in existing_outlet_names:
-                    new_outlets.append(Outlet(**outlet_data))
-                    existing_outlet_names.add(outlet_data['name'])  # Track in memory too
-                else:
-                    logger.debug(f"Outlet '{outlet_data['name']}' already exists, skipping...")
-
-            if new_outlets:
-                # Batch insert in smaller chunks to reduce lock time
-                batch_size = 50
-                total_added = 0
-                
-                for i in range(0, len(new_outlets), batch_size):
-                    batch = new_outlets[i:i + batch_size]
-                    db.add_all(batch)
-                    db.commit()
-                    total_added += len(batch)
-                    logger.info(f"✓ Committed batch of {len(batch)} outlets (total: {total_added}/{len(new_outlets)})")
-                
+            # The unique name index dedupes in-engine; existing outlets are skipped
+            total_added = bulk_insert_outlets(db, outlets_data)
+            if total_added:
                 logger.info(f"✓ Added {total_added} new outlets to database")
             else:
                 logger.info("No new outlets to add.")
 
             # Get final count
-            total_count = db.query(Outlet).count()
+            total_count = db.execute(select(func.count()).select_from(outlets_table)).scalar_one()
             logger.info(f"✓ Total outlets in database: {total_count}")
             
             # Success - break out of retry loop
@@ -8,6 +8,8 @@ import logging
 from pathlib import Path
 from typing import List, Dict, Any
 import time
+import re
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     import requests
@@ -17,9 +19,18 @@ except ImportError:
     print("  pip install requests beautifulsoup4")
     sys.exit(1)
 
+# libxml2-backed parsing is several times faster; fall back to the stdlib parser
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from scripts.http_cache import fetch_page, open_page
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -31,14 +42,18 @@ logger = logging.getLogger(__name__)
 BASE_URL = "https://shop.zuscoffee.com"
 DRINKWARE_URL = f"{BASE_URL}/collections/drinkware"
 
-# Headers to mimic a browser request
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-    "Accept-Language": "en-US,en;q=0.5",
-    "Accept-Encoding": "gzip, deflate",
-    "Connection": "keep-alive",
-}
+# Output of the last scrape, reused as-is while the listing page is unchanged
+PRODUCTS_FILE = Path(__file__).parent.parent / "data" / "products" / "products.json"
+
+# Product pages fetched in parallel, each worker pausing REQUEST_DELAY seconds between pages
+MAX_CONCURRENT_FETCHES = 4
+REQUEST_DELAY = 1.0
+
+# Product pages barely change day to day, so cached copies are trusted this long before revalidating
+PAGE_CACHE_TTL = 24 * 60 * 60
+
+# Labels Shopify puts in front of the amount; earlier alternatives take precedence
+PRICE_PREFIX_PATTERN = re.compile(r'^(?:sale price|price|regular price|original price|now|from)', re.IGNORECASE)
 
 
 def clean_price(price_text: str) -> str:
@@ -55,27 +70,8 @@ def clean_price(price_text: str) -> str:
     if not price_text:
         return None
     
-    # Remove common prefixes (case insensitive)
-    prefixes = [
-        "sale price",
-        "price",
-        "regular price",
-        "original price",
-        "now",
-        "from"
-    ]
-    
-    cleaned = price_text.strip()
-    for prefix in prefixes:
-        # Remove prefix if it appears at the start (case insensitive)
-        # Handle both spaced and concatenated versions
-        prefix_lower = prefix.lower()
-        cleaned_lower = cleaned.lower()
-        
-        if cleaned_lower.startswith(prefix_lower):
-            # Remove the prefix
-            cleaned = cleaned[len(prefix):].strip()
-            break  # Only remove the first matching prefix
+    # Remove the first matching prefix, spaced or concatenated (case insensitive)
+    cleaned = PRICE_PREFIX_PATTERN.sub('', price_text.strip(), count=1)
     
     # Clean up any extra whitespace
     cleaned = ' '.join(cleaned.split())
@@ -94,13 +90,10 @@ def scrape_product_page(product_url: str) -> Dict[str, Any]:
         Dictionary with product details (mainly description)
     """
     try:
-        response = requests.get(product_url, headers=HEADERS, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = BeautifulSoup(fetch_page(product_url, max_age=PAGE_CACHE_TTL), HTML_PARSER)
         
         # Extract product name
-        name_elem = soup.find('h1') or soup.find('h2', class_=lambda x: x and 'product' in str(x).lower() and 'title' in str(x).lower())
+        name_elem = soup.find('h1') or soup.select_one('h2[class*="product" i][class*="title" i]')
         name = name_elem.get_text(strip=True) if name_elem else None
         
         # Extract description - try multiple methods
@@ -124,13 +117,13 @@ def scrape_product_page(product_url: str) -> Dict[str, Any]:
         
         # Method 2: Look for meta description
         if not description:
-            meta_desc = soup.find('meta', {'property': 'og:description'})
+            meta_desc = soup.select_one('meta[property="og:description"]')
             if meta_desc:
                 description = meta_desc.get('content', '')
         
         # Method 3: Look for any paragraph in product sections
         if not description:
-            product_sections = soup.find_all(['div', 'section'], class_=lambda x: x and 'product' in str(x).lower())
+            product_sections = soup.select('div[class*="product" i], section[class*="product" i]')
             for section in product_sections:
                 paragraphs = section.find_all('p')
                 if paragraphs:
@@ -138,9 +131,9 @@ def scrape_product_page(product_url: str) -> Dict[str, Any]:
                     break
         
         # Extract price
-        price_elem = soup.find('sale-price') or \
-                    soup.find('span', class_=lambda x: x and 'price' in str(x).lower()) or \
-                    soup.find('div', class_=lambda x: x and 'price' in str(x).lower())
+        price_elem = soup.select_one('sale-price') or \
+                    soup.select_one('span[class*="price" i]') or \
+                    soup.select_one('div[class*="price" i]')
         price = None
         if price_elem:
             price_text = price_elem.get_text(strip=True)
@@ -177,7 +170,7 @@ def extract_product_from_card(card_elem) -> Dict[str, Any]:
     """
     try:
         # Find product link
-        link_elem = card_elem.find('a', href=lambda x: x and '/products/' in x)
+        link_elem = card_elem.select_one('a[href*="/products/"]')
         if not link_elem:
             return None
         
@@ -193,21 +186,21 @@ def extract_product_from_card(card_elem) -> Dict[str, Any]:
         product_url = product_url.split('?')[0].split('#')[0]
         
         # Extract product name from product-card__title
-        title_elem = card_elem.find('span', class_='product-card__title')
+        title_elem = card_elem.select_one('span.product-card__title')
         if title_elem:
             name_link = title_elem.find('a')
             name = name_link.get_text(strip=True) if name_link else title_elem.get_text(strip=True)
         else:
             # Fallback: try to find any heading or title
-            name_elem = card_elem.find(['h2', 'h3', 'h4']) or card_elem.find('span', class_=lambda x: x and 'title' in str(x).lower())
+            name_elem = card_elem.select_one('h2, h3, h4') or card_elem.select_one('span[class*="title" i]')
             name = name_elem.get_text(strip=True) if name_elem else "Unknown Product"
         
         # Extract category from product-card__category
-        category_elem = card_elem.find('span', class_='product-card__category')
+        category_elem = card_elem.select_one('span.product-card__category')
         category = category_elem.get_text(strip=True) if category_elem else None
         
         # Extract price from sale-price
-        price_elem = card_elem.find('sale-price') or card_elem.find('span', class_=lambda x: x and 'price' in str(x).lower())
+        price_elem = card_elem.select_one('sale-price') or card_elem.select_one('span[class*="price" i]')
         price = None
         if price_elem:
             price_text = price_elem.get_text(strip=True)
@@ -243,31 +236,35 @@ def scrape_drinkware_products() -> List[Dict[str, Any]]:
     
     try:
         logger.info(f"Fetching drinkware page: {DRINKWARE_URL}")
-        response = requests.get(DRINKWARE_URL, headers=HEADERS, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
+        # Always revalidated: a 304 means the previous scrape's products still stand
+        with open_page(DRINKWARE_URL) as (body, modified):
+            if not modified and PRODUCTS_FILE.exists():
+                logger.info(f"Listing unchanged, reusing {PRODUCTS_FILE}")
+                with open(PRODUCTS_FILE, encoding='utf-8') as f:
+                    return json.load(f)
+            soup = BeautifulSoup(body, HTML_PARSER)
         
         # Find all product cards using the actual structure
         product_cards = []
         
         # Try to find product-card__info elements
-        cards = soup.find_all('div', class_=lambda x: x and 'product-card__info' in str(x))
+        cards = soup.select('div[class*="product-card__info"]')
         if cards:
             product_cards = cards
             logger.info(f"Found {len(cards)} product cards using product-card__info")
         else:
             # Fallback: look for product-card elements
-            cards = soup.find_all('div', class_=lambda x: x and 'product-card' in str(x))
+            cards = soup.select('div[class*="product-card"]')
             if cards:
                 product_cards = cards
                 logger.info(f"Found {len(cards)} product cards using product-card")
             else:
-                # Last resort: find any div containing product links
-                all_divs = soup.find_all('div')
-                for div in all_divs:
-                    if div.find('a', href=lambda x: x and '/products/' in x):
-                        product_cards.append(div)
+                # Last resort: one query for the product links, each climbing to its nearest div
+                cards_by_id = {}
+                for link in soup.select('div a[href*="/products/"]'):
+                    card = link.find_parent('div')
+                    cards_by_id.setdefault(id(card), card)
+                product_cards = list(cards_by_id.values())
                 logger.info(f"Found {len(product_cards)} product cards using fallback method")
         
         # Extract products from cards
@@ -286,19 +283,25 @@ def scrape_drinkware_products() -> List[Dict[str, Any]]:
         scrape_individual_pages = True
         if scrape_individual_pages and products:
             logger.info("Scraping individual product pages for detailed descriptions...")
-            for i, product in enumerate(products, 1):
+            
+            def fetch_details(numbered_product) -> Dict[str, Any]:
+                i, product = numbered_product
                 try:
                     logger.info(f"Fetching details for product {i}/{len(products)}: {product['name']}")
-                    detailed_product = scrape_product_page(product['url'])
-                    if detailed_product:
-                        # Update with detailed info, keep original if detailed scrape fails
-                        product['description'] = detailed_product.get('description', product.get('description', ''))
-                        if detailed_product.get('price') and not product.get('price'):
-                            product['price'] = detailed_product['price']
-                    time.sleep(1)  # Be respectful with requests
-                except Exception as e:
-                    logger.warning(f"Error fetching details for {product['url']}: {e}")
-                    continue
+                    return scrape_product_page(product['url'])
+                finally:
+                    # Keep the per-worker pause so the shop is not hammered
+                    time.sleep(REQUEST_DELAY)
+            
+            with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_FETCHES, len(products))) as executor:
+                details = list(executor.map(fetch_details, enumerate(products, 1)))
+            
+            for product, detailed_product in zip(products, details):
+                if detailed_product:
+                    # Update with detailed info, keep original if detailed scrape fails
+                    product['description'] = detailed_product.get('description', product.get('description', ''))
+                    if detailed_product.get('price') and not product.get('price'):
+                        product['price'] = detailed_product['price']
         
         # Add IDs
         for i, product in enumerate(products, 1):
@@ -321,8 +324,7 @@ def scrape_drinkware_products() -> List[Dict[str, Any]]:
 def main():
     """Main function to scrape and save products."""
     # Create data directory if it doesn't exist
-    data_dir = Path(__file__).parent.parent / "data" / "products"
-    data_dir.mkdir(parents=True, exist_ok=True)
+    PRODUCTS_FILE.parent.mkdir(parents=True, exist_ok=True)
     
     logger.info("Starting product scraping...")
     products = scrape_drinkware_products()
@@ -332,11 +334,10 @@ def main():
         sys.exit(1)
     
     # Save to JSON
-    output_file = data_dir / "products.json"
-    with open(output_file, 'w', encoding='utf-8') as f:
+    with open(PRODUCTS_FILE, 'w', encoding='utf-8') as f:
         json.dump(products, f, indent=2, ensure_ascii=False)
     
-    logger.info(f"✓ Saved {len(products)} products to {output_file}")
+    logger.info(f"✓ Saved {len(products)} products to {PRODUCTS_FILE}")
     logger.info("Product scraping complete!")
 
 
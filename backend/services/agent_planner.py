@@ -1,7 +1,10 @@
 import os
+import copy
+import json
 import logging
 import re
-from typing import Dict, Any, Optional, List, Union
+import threading
+from typing import Dict, Any, Optional, List, Tuple, Union
 
 try:
     from langchain_google_genai import ChatGoogleGenerativeAI
@@ -12,8 +15,93 @@ except ImportError:
     ChatPromptTemplate = None
     BaseChatModel = None
 
+from services.cache import TTLCache
+
 logger = logging.getLogger(__name__)
 
+# Kept byte-identical across turns so provider prompt caching can reuse it.
+# Per-turn context follows it and the user's message always comes last.
+INTENT_SYSTEM_PROMPT = """You are an intent classifier for a ZUS Coffee chatbot. 
+                Classify the user's intent into one of these categories:
+                - calculator: Mathematical calculations (e.g., "2+2", "calculate 10*5")
+                - product_search: Searching for products (e.g., "show me tumblers", "find mugs")
+                - outlet_query: Finding outlets/locations (e.g., "outlets in Petaling Jaya", "SS 2 opening hours")
+                - general_chat: General conversation
+                
+                Extract relevant slots:
+                - For calculator: "expression" (the math expression)
+                - For product_search: "query" (search terms)
+                - For outlet_query: "query" (location/outlet name), "followup" (if asking about hours/services/location: "hours", "open_time", "close_time", "services", or "location")
+                
+                IMPORTANT: Return ONLY valid JSON. Example for outlet services query:
+                {{"intent": "outlet_query", "confidence": 0.9, "slots": {{"query": "outlet name", "followup": "services"}}, "missing_slots": []}}
+                
+                Return JSON with: intent, confidence (0-1), slots (dict), missing_slots (list)"""
+
+
+def _keyword_pattern(keywords: List[str]) -> re.Pattern:
+    """One alternation that matches wherever any of the keywords occurs as a substring."""
+    return re.compile("|".join(re.escape(keyword) for keyword in keywords))
+
+
+# Reset is matched on whole words, so e.g. "unclear" does not wipe the session
+WORD_PATTERN = re.compile(r"[a-z']+")
+RESET_WORDS = frozenset({'reset', 'clear'})
+RESET_PHRASES = ('start over', 'new conversation')
+
+# Rule-based classifier patterns, compiled once instead of per turn
+OUTLET_FOLLOWUP_PATTERN = _keyword_pattern([
+    'hour', 'time', 'open', 'close', 'when', 'opening', 'closing',
+    'service', 'services', 'drive through', 'drive-through', 'wifi',
+    'dine-in', 'dine in', 'what are the services', 'have', 'location', 'where', 'address'
+])
+LOCATION_FOLLOWUP_PATTERN = _keyword_pattern(['location', 'where', 'address'])
+SERVICES_FOLLOWUP_PATTERN = _keyword_pattern(['service', 'services', 'drive through', 'wifi', 'dine'])
+CLOSE_FOLLOWUP_PATTERN = _keyword_pattern(['close', 'closing', 'close time', 'closing time'])
+OPEN_FOLLOWUP_PATTERN = _keyword_pattern(['open', 'opening', 'open time', 'opening time'])
+
+MATH_PATTERN = re.compile(
+    r'(?:^|\s)(?:\d+\s*[+\-*/]\s*\d+|calculate|compute|what is|what\'s|math|plus|minus|times|multiply|divide)(?:\s|$)'
+)
+NON_MATH_KEYWORD_PATTERN = _keyword_pattern(['outlet', 'zus', 'coffee', 'petaling', 'jaya', 'kl', 'kuala', 'lumpur'])
+PRODUCT_INTENT_PATTERN = _keyword_pattern([
+    'product', 'item', 'tumbler', 'mug', 'bottle', 'drinkware', 'buy', 'purchase',
+    'cup', 'cups', 'og cup', 'all day', 'frozee', 'all-can', 'ceramic', 'steel'
+])
+OUTLET_INTENT_PATTERN = re.compile(r'outlet|location|store|where|find|near|petaling jaya|kl|kuala lumpur|selangor')
+
+# Slot extraction patterns
+EXPRESSION_PATTERN = re.compile(r'(\d+\s*[+\-*/]\s*\d+)|calculate\s+(.+)|what is\s+(.+)|what\'s\s+(.+)', re.IGNORECASE)
+ALL_PRODUCTS_PATTERN = re.compile(r'^(show|find|list|what|do you have|get|see)\s+(me\s+)?(all\s+)?(products?|items?)$')
+PRODUCT_QUERY_STRIP_PATTERN = re.compile(
+    r'^(show|find|search|what|do you have|get|see|list)\s+(me\s+)?|\s+(products?|items?)$', re.IGNORECASE
+)
+LOCATION_QUERY_STRIP_PATTERN = re.compile(r'(find|where|outlets?|locations?|stores?|branches?)', re.IGNORECASE)
+FULL_OUTLET_NAME_PATTERN = re.compile(r'zus\s+coffee\s*[–\-]\s*([^,?\n]+)', re.IGNORECASE)
+OUTLET_NAME_FILLER_PATTERN = re.compile(
+    r'(what|what\'s|what are|the|opening|hours?|time|when|is|there|an|outlet|in|zus\s+coffee|have|services?|service)',
+    re.IGNORECASE
+)
+JSON_OBJECT_PATTERNS = (
+    re.compile(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', re.DOTALL),
+    re.compile(r'\{[^}]*\}', re.DOTALL),
+)
+
+# Short forms users type for well-known outlets
+OUTLET_ALIASES = {
+    'ss': 'SS2',
+    'ss2': 'SS2',
+    'ss 2': 'SS2',
+    'utama': '1 Utama',
+    'klcc': 'KLCC',
+    'pavilion': 'Pavilion',
+    'sunway': 'Sunway Pyramid',
+    'subang': 'Subang Jaya',
+    'damansara': 'Damansara Perdana',
+    'megah rise': 'Megah Rise Mall',
+    'pj new town': 'PJ New Town'
+}
+
 
 class AgentPlanner:
     
@@ -23,8 +111,14 @@ class AgentPlanner:
     INTENT_CHAT = "general_chat"
     INTENT_RESET = "reset"
     
+    INTENT_CACHE_SIZE = 1024
+    INTENT_CACHE_TTL = 300.0
+    
     def __init__(self):
         self.llm: Optional[BaseChatModel] = None
+        self._intent_chain = None
+        # analyze_intent runs in worker threads, so the cache must be thread-safe
+        self._intent_cache = TTLCache(maxsize=self.INTENT_CACHE_SIZE, ttl=self.INTENT_CACHE_TTL)
         self._initialize()
     
     def _initialize(self) -> None:
@@ -37,10 +131,16 @@ class AgentPlanner:
                     temperature=0,
                     google_api_key=gemini_key
                 )
+                # The prompt and chain are invariant, so compose them once per planner
+                self._intent_chain = ChatPromptTemplate.from_messages([
+                    ("system", INTENT_SYSTEM_PROMPT),
+                    ("human", "Context: {context}\n\nUser input: {user_input}")
+                ]) | self.llm
                 logger.info("Agent planner initialized with Google Gemini")
             except Exception as e:
                 logger.warning(f"Could not initialize Gemini: {e}")
                 self.llm = None
+                self._intent_chain = None
         else:
             if not gemini_key:
                 logger.warning("GEMINI_API_KEY not found in environment variables")
@@ -54,7 +154,7 @@ class AgentPlanner:
     def analyze_intent(self, user_input: str, memory: Dict[str, Any]) -> Dict[str, Any]:
         user_lower = user_input.lower().strip()
         
-        if any(word in user_lower for word in ['reset', 'clear', 'start over', 'new conversation']):
+        if not RESET_WORDS.isdisjoint(WORD_PATTERN.findall(user_lower)) or any(phrase in user_lower for phrase in RESET_PHRASES):
             return {
                 "intent": self.INTENT_RESET,
                 "confidence": 0.9,
@@ -62,59 +162,54 @@ class AgentPlanner:
                 "missing_slots": []
             }
         
+        # Classification depends on the message and the outlets in context
+        last_outlets = memory.get("context", {}).get("last_outlets", [])
+        cache_key = (user_lower, tuple(outlet.get("name", "") for outlet in last_outlets))
+        cached = self._intent_cache.get(cache_key)
+        if cached is None:
+            cached, cacheable = self._classify_intent(user_input, memory)
+            if cacheable:
+                self._intent_cache.set(cache_key, cached)
+        # Callers get their own copy (slots may nest), so edits never leak into the cached entry
+        return copy.deepcopy(cached)
+    
+    def clear_intent_cache(self) -> None:
+        self._intent_cache.clear()
+    
+    def _classify_intent(self, user_input: str, memory: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """Classify the input; the flag is False when a failed LLM call left only the rule-based guess."""
         # Try LLM-based classification if available
         if self.llm is not None:
-            try:
-                return self._llm_classify_intent(user_input, memory)
-            except Exception as e:
-                logger.warning(f"LLM intent classification failed: {e}, falling back to rule-based")
+            result = self._llm_classify_intent(user_input, memory)
+            if result is not None:
+                return result, True
+            # LLM failures are usually transient, so the stand-in answer must not be cached
+            return self._rule_based_classify_intent(user_input, memory), False
         
-        # Fallback to rule-based classification
-        return self._rule_based_classify_intent(user_input, memory)
+        return self._rule_based_classify_intent(user_input, memory), True
     
-    def _llm_classify_intent(self, user_input: str, memory: Dict[str, Any]) -> Dict[str, Any]:
+    def _llm_classify_intent(self, user_input: str, memory: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         try:
-            from langchain_core.prompts import ChatPromptTemplate
-            
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", """You are an intent classifier for a ZUS Coffee chatbot. 
-                Classify the user's intent into one of these categories:
-                - calculator: Mathematical calculations (e.g., "2+2", "calculate 10*5")
-                - product_search: Searching for products (e.g., "show me tumblers", "find mugs")
-                - outlet_query: Finding outlets/locations (e.g., "outlets in Petaling Jaya", "SS 2 opening hours")
-                - general_chat: General conversation
-                
-                Extract relevant slots:
-                - For calculator: "expression" (the math expression)
-                - For product_search: "query" (search terms)
-                - For outlet_query: "query" (location/outlet name), "followup" (if asking about hours/services/location: "hours", "open_time", "close_time", "services", or "location")
-                
-                IMPORTANT: Return ONLY valid JSON. Example for outlet services query:
-                {{"intent": "outlet_query", "confidence": 0.9, "slots": {{"query": "outlet name", "followup": "services"}}, "missing_slots": []}}
-                
-                Return JSON with: intent, confidence (0-1), slots (dict), missing_slots (list)"""),
-                ("human", "User input: {user_input}\n\nContext: {context}")
-            ])
-            
             context = f"Last outlets: {memory.get('context', {}).get('last_outlets', [])[:3]}"
             
-            chain = prompt | self.llm
-            response = chain.invoke({
+            response = self._intent_chain.invoke({
                 "user_input": user_input,
                 "context": context
             })
             
-            import json
             content = response.content if hasattr(response, 'content') else str(response)
             
-            result = None
-            json_patterns = [
-                r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}',
-                r'\{[^}]*\}',
-            ]
+            # Well-formed replies parse directly; the regex extractors are only a fallback
+            try:
+                result = json.loads(content.strip())
+                if isinstance(result, dict) and result.get("intent") in [self.INTENT_CALCULATOR, self.INTENT_PRODUCTS, 
+                                                                         self.INTENT_OUTLETS, self.INTENT_CHAT]:
+                    return result
+            except json.JSONDecodeError:
+                pass
             
-            for pattern in json_patterns:
-                json_match = re.search(pattern, content, re.DOTALL)
+            for pattern in JSON_OBJECT_PATTERNS:
+                json_match = pattern.search(content)
                 if json_match:
                     try:
                         result = json.loads(json_match.group())
@@ -124,39 +219,28 @@ class AgentPlanner:
                     except json.JSONDecodeError:
                         continue
             
-            try:
-                result = json.loads(content.strip())
-                if result.get("intent") in [self.INTENT_CALCULATOR, self.INTENT_PRODUCTS, 
-                                           self.INTENT_OUTLETS, self.INTENT_CHAT]:
-                    return result
-            except json.JSONDecodeError:
-                pass
-            
             logger.warning("Failed to parse LLM response, using rule-based classification")
-            return self._rule_based_classify_intent(user_input, memory)
+            return None
             
         except Exception as e:
             logger.error(f"Error in LLM intent classification: {e}", exc_info=True)
-            return self._rule_based_classify_intent(user_input, memory)
+            return None
     
     def _rule_based_classify_intent(self, user_input: str, memory: Dict[str, Any]) -> Dict[str, Any]:
         user_lower = user_input.lower()
         
-        outlet_keywords = ['hour', 'time', 'open', 'close', 'when', 'opening', 'closing', 
-                          'service', 'services', 'drive through', 'drive-through', 'wifi', 
-                          'dine-in', 'dine in', 'what are the services', 'have', 'location', 'where', 'address']
-        if any(keyword in user_lower for keyword in outlet_keywords):
+        if OUTLET_FOLLOWUP_PATTERN.search(user_lower):
             last_outlets = memory.get("context", {}).get("last_outlets", [])
             if last_outlets or 'zus' in user_lower or 'outlet' in user_lower:
                 outlet_name = self._extract_outlet_name(user_input, last_outlets)
                 if outlet_name:
-                    if any(word in user_lower for word in ['location', 'where', 'address']):
+                    if LOCATION_FOLLOWUP_PATTERN.search(user_lower):
                         followup_type = "location"
-                    elif any(word in user_lower for word in ['service', 'services', 'drive through', 'wifi', 'dine']):
+                    elif SERVICES_FOLLOWUP_PATTERN.search(user_lower):
                         followup_type = "services"
-                    elif any(word in user_lower for word in ['close', 'closing', 'close time', 'closing time']):
+                    elif CLOSE_FOLLOWUP_PATTERN.search(user_lower):
                         followup_type = "close_time"
-                    elif any(word in user_lower for word in ['open', 'opening', 'open time', 'opening time']):
+                    elif OPEN_FOLLOWUP_PATTERN.search(user_lower):
                         followup_type = "open_time"
                     else:
                         followup_type = "hours"
@@ -167,8 +251,7 @@ class AgentPlanner:
                         "missing_slots": []
                     }
         
-        math_pattern = r'(?:^|\s)(?:\d+\s*[+\-*/]\s*\d+|calculate|compute|what is|what\'s|math|plus|minus|times|multiply|divide)(?:\s|$)'
-        if re.search(math_pattern, user_lower) and not any(word in user_lower for word in ['outlet', 'zus', 'coffee', 'petaling', 'jaya', 'kl', 'kuala', 'lumpur']):
+        if MATH_PATTERN.search(user_lower) and not NON_MATH_KEYWORD_PATTERN.search(user_lower):
             expression = self._extract_expression(user_input)
             return {
                 "intent": self.INTENT_CALCULATOR,
@@ -177,9 +260,7 @@ class AgentPlanner:
                 "missing_slots": ["expression"] if not expression else []
             }
         
-        product_keywords = ['product', 'item', 'tumbler', 'mug', 'bottle', 'drinkware', 'buy', 'purchase', 
-                           'cup', 'cups', 'og cup', 'all day', 'frozee', 'all-can', 'ceramic', 'steel']
-        if any(keyword in user_lower for keyword in product_keywords):
+        if PRODUCT_INTENT_PATTERN.search(user_lower):
             query = self._extract_product_query(user_input)
             return {
                 "intent": self.INTENT_PRODUCTS,
@@ -188,7 +269,7 @@ class AgentPlanner:
                 "missing_slots": ["query"] if not query else []
             }
         
-        if re.search(r'outlet|location|store|where|find|near|petaling jaya|kl|kuala lumpur|selangor', user_lower):
+        if OUTLET_INTENT_PATTERN.search(user_lower):
             query = self._extract_location_query(user_input)
             if 'near me' in user_lower or 'all outlets' in user_lower:
                 query = "all outlets"
@@ -207,26 +288,25 @@ class AgentPlanner:
         }
     
     def _extract_expression(self, text: str) -> Optional[str]:
-        match = re.search(r'(\d+\s*[+\-*/]\s*\d+)|calculate\s+(.+)|what is\s+(.+)|what\'s\s+(.+)', text, re.IGNORECASE)
+        match = EXPRESSION_PATTERN.search(text)
         if match:
             return match.group(1) or match.group(2) or match.group(3) or match.group(4)
         return None
     
     def _extract_product_query(self, text: str) -> Optional[str]:
         text_lower = text.lower().strip()
-        if re.match(r'^(show|find|list|what|do you have|get|see)\s+(me\s+)?(all\s+)?(products?|items?)$', text_lower):
+        if ALL_PRODUCTS_PATTERN.match(text_lower):
             return "all products"
-        text = re.sub(r'^(show|find|search|what|do you have|get|see|list)\s+(me\s+)?|\s+(products?|items?)$', '', text, flags=re.IGNORECASE).strip()
+        text = PRODUCT_QUERY_STRIP_PATTERN.sub('', text).strip()
         return text if text else None
     
     def _extract_location_query(self, text: str) -> Optional[str]:
-        text = re.sub(r'(find|where|outlets?|locations?|stores?|branches?)', '', text, flags=re.IGNORECASE).strip()
+        text = LOCATION_QUERY_STRIP_PATTERN.sub('', text).strip()
         return text if len(text) > 2 else "all"
     
     def _extract_outlet_name(self, text: str, available_outlets: List[Dict[str, Any]]) -> Optional[str]:
         text_lower = text.lower()
-        full_outlet_pattern = r'zus\s+coffee\s*[–\-]\s*([^,?\n]+)'
-        match = re.search(full_outlet_pattern, text_lower, re.IGNORECASE)
+        match = FULL_OUTLET_NAME_PATTERN.search(text_lower)
         if match:
             extracted_name = match.group(1).strip()
             if available_outlets:
@@ -244,21 +324,7 @@ class AgentPlanner:
                     if matches >= 2 or (matches == 1 and len(outlet_words) == 1):
                         return outlet.get('name')
         
-        outlet_keywords = {
-            'ss': 'SS2',
-            'ss2': 'SS2',
-            'ss 2': 'SS2',
-            'utama': '1 Utama',
-            'klcc': 'KLCC',
-            'pavilion': 'Pavilion',
-            'sunway': 'Sunway Pyramid',
-            'subang': 'Subang Jaya',
-            'damansara': 'Damansara Perdana',
-            'megah rise': 'Megah Rise Mall',
-            'pj new town': 'PJ New Town'
-        }
-        
-        for keyword, default_name in outlet_keywords.items():
+        for keyword, default_name in OUTLET_ALIASES.items():
             if keyword in text_lower:
                 if available_outlets:
                     for outlet in available_outlets:
@@ -268,7 +334,7 @@ class AgentPlanner:
                 return default_name
         
         if available_outlets:
-            cleaned = re.sub(r'(what|what\'s|what are|the|opening|hours?|time|when|is|there|an|outlet|in|zus\s+coffee|have|services?|service)', '', text_lower, flags=re.IGNORECASE)
+            cleaned = OUTLET_NAME_FILLER_PATTERN.sub('', text_lower)
             cleaned = cleaned.strip().strip('–-,').strip()
             if cleaned and len(cleaned) > 2:
                 best_match = self._find_best_outlet_match(cleaned, available_outlets)
@@ -327,11 +393,15 @@ class AgentPlanner:
 
 
 _agent_planner: Optional[AgentPlanner] = None
+_agent_planner_lock = threading.Lock()
 
 
 def get_agent_planner() -> AgentPlanner:
     global _agent_planner
     if _agent_planner is None:
-        _agent_planner = AgentPlanner()
+        # Callers may race from worker threads; only one instance may ever be published
+        with _agent_planner_lock:
+            if _agent_planner is None:
+                _agent_planner = AgentPlanner()
     return _agent_planner
 
@@ -1,30 +1,79 @@
 import logging
-from typing import Dict, Any, Optional, List
+import threading
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, List, Union
 from datetime import datetime
 from models.schemas import ChatMessage
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(slots=True)
+class HistoryEntry:
+    """Memory-only history record; ChatMessage is kept for the API boundary."""
+    role: str
+    content: str
+    timestamp: Optional[str] = None
+
+
 class MemoryManager:
     def __init__(self):
         self.memories: Dict[str, Dict[str, Any]] = {}
+        # Guards writes; tool calls and LLM intent analysis run in worker threads
+        self._lock = threading.Lock()
     
     def get_memory(self, session_id: str) -> Dict[str, Any]:
-        if session_id not in self.memories:
-            self.memories[session_id] = {
+        memory = self.memories.get(session_id)
+        if memory is None:
+            memory = self.memories.setdefault(session_id, {
                 "slots": {},
                 "context": {},
                 "history": [],
                 "last_updated": datetime.utcnow().isoformat()
+            })
+        return memory
+    
+    def get_turn_context(self, session_id: str) -> Dict[str, Any]:
+        """Single read of everything a chat turn needs, as a snapshot safe to hand to another thread."""
+        memory = self.get_memory(session_id)
+        with self._lock:
+            return {
+                "slots": dict(memory["slots"]),
+                "context": dict(memory["context"]),
+                "history": list(memory["history"]),
+                "last_updated": memory["last_updated"]
             }
-        return self.memories[session_id]
+    
+    def commit_turn(
+        self,
+        session_id: str,
+        messages: List[HistoryEntry],
+        slots: Optional[Dict[str, Any]] = None,
+        context_updates: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Apply all writes for a turn at once and return the memory summary."""
+        memory = self.get_memory(session_id)
+        now = datetime.utcnow().isoformat()
+        with self._lock:
+            self._append_history(memory, messages, now)
+            if slots:
+                memory["slots"].update(slots)
+            if context_updates:
+                memory["context"].update(context_updates)
+            memory["last_updated"] = now
+            return self._summarize(memory)
     
     def update_slot(self, session_id: str, slot_name: str, value: Any) -> None:
+        self.update_slots(session_id, {slot_name: value})
+    
+    def update_slots(self, session_id: str, slots: Dict[str, Any]) -> None:
+        if not slots:
+            return
         memory = self.get_memory(session_id)
-        memory["slots"][slot_name] = value
-        memory["last_updated"] = datetime.utcnow().isoformat()
-        logger.info(f"Updated slot {slot_name} for session {session_id}")
+        with self._lock:
+            memory["slots"].update(slots)
+            memory["last_updated"] = datetime.utcnow().isoformat()
+        logger.info("Updated slots %s for session %s", list(slots), session_id)
     
     def get_slot(self, session_id: str, slot_name: str, default: Any = None) -> Any:
         memory = self.get_memory(session_id)
@@ -32,26 +81,34 @@ class MemoryManager:
     
     def update_context(self, session_id: str, key: str, value: Any) -> None:
         memory = self.get_memory(session_id)
-        memory["context"][key] = value
-        memory["last_updated"] = datetime.utcnow().isoformat()
-        logger.info(f"Updated context {key} for session {session_id}")
+        with self._lock:
+            memory["context"][key] = value
+            memory["last_updated"] = datetime.utcnow().isoformat()
+        logger.info("Updated context %s for session %s", key, session_id)
     
     def get_context(self, session_id: str, key: str, default: Any = None) -> Any:
         memory = self.get_memory(session_id)
         return memory["context"].get(key, default)
     
     def add_to_history(self, session_id: str, message: ChatMessage) -> None:
+        self.add_to_history_batch(session_id, [message])
+    
+    def add_to_history_batch(self, session_id: str, messages: List[ChatMessage]) -> None:
         memory = self.get_memory(session_id)
-        memory["history"].append({
-            "role": message.role,
-            "content": message.content,
-            "timestamp": message.timestamp or datetime.utcnow().isoformat()
-        })
+        now = datetime.utcnow().isoformat()
+        with self._lock:
+            self._append_history(memory, messages, now)
+            memory["last_updated"] = now
+    
+    def _append_history(self, memory: Dict[str, Any], messages: List[Union[ChatMessage, HistoryEntry]], now: str) -> None:
+        memory["history"].extend(
+            HistoryEntry(message.role, message.content, message.timestamp or now)
+            for message in messages
+        )
         if len(memory["history"]) > 50:
             memory["history"] = memory["history"][-50:]
-        memory["last_updated"] = datetime.utcnow().isoformat()
     
-    def get_history(self, session_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    def get_history(self, session_id: str, limit: Optional[int] = None) -> List[HistoryEntry]:
         memory = self.get_memory(session_id)
         history = memory["history"]
         if limit:
@@ -66,23 +123,29 @@ class MemoryManager:
                 "history": [],
                 "last_updated": datetime.utcnow().isoformat()
             }
-            logger.info(f"Cleared memory for session {session_id}")
+            logger.info("Cleared memory for session %s", session_id)
     
     def get_memory_summary(self, session_id: str) -> Dict[str, Any]:
-        memory = self.get_memory(session_id)
+        return self._summarize(self.get_memory(session_id))
+    
+    def _summarize(self, memory: Dict[str, Any]) -> Dict[str, Any]:
         return {
             "slots": memory["slots"],
-            "context_keys": list(memory["context"].keys()),
+            "context_keys": [key for key in memory["context"] if not key.startswith("_")],
             "history_length": len(memory["history"]),
             "last_updated": memory["last_updated"]
         }
 
 
 _memory_manager: Optional[MemoryManager] = None
+_memory_manager_lock = threading.Lock()
 
 
 def get_memory_manager() -> MemoryManager:
     global _memory_manager
     if _memory_manager is None:
-        _memory_manager = MemoryManager()
+        # Callers may race from worker threads; only one instance may ever be published
+        with _memory_manager_lock:
+            if _memory_manager is None:
+                _memory_manager = MemoryManager()
     return _memory_manager
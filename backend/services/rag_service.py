@@ -1,5 +1,7 @@
 import json
 import logging
+import threading
+import time
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 
@@ -16,6 +18,11 @@ logger = logging.getLogger(__name__)
 
 
 class RAGService:
+    # Paraphrased queries ("tumblers please" vs "show me tumbler") reuse earlier results
+    SEMANTIC_CACHE_SIZE = 256
+    SEMANTIC_CACHE_THRESHOLD = 0.95
+    SEMANTIC_CACHE_TTL = 300.0
+    
     def __init__(
         self,
         products_dir: str = "data/products",
@@ -33,6 +40,11 @@ class RAGService:
         self.products: List[Dict[str, Any]] = []
         self.chunks: List[Dict[str, Any]] = []
         
+        self._semantic_vectors: Optional[Any] = None
+        self._semantic_entries: List[Optional[tuple]] = []
+        self._semantic_next = 0
+        self._semantic_lock = threading.Lock()
+        
         self.index_dir.mkdir(parents=True, exist_ok=True)
         self.products_dir.mkdir(parents=True, exist_ok=True)
         
@@ -225,6 +237,11 @@ class RAGService:
                 raise ImportError("numpy is required for FAISS operations")
             query_embedding = np.array(query_embedding).astype('float32')
             
+            cached = self._semantic_cache_get(query_embedding[0], top_k)
+            if cached is not None:
+                logger.info(f"Semantic cache hit for query: {query}")
+                return cached
+            
             k = min(top_k, len(self.chunks))
             distances, indices = self.index.search(query_embedding, k)
             
@@ -252,15 +269,48 @@ class RAGService:
             results = sorted(product_scores.values(), key=lambda x: x["score"], reverse=True)[:top_k]
             
             logger.info(f"Found {len(results)} products for query: {query}")
+            self._semantic_cache_set(query_embedding[0], top_k, results)
             return results
             
         except Exception as e:
             logger.error(f"Error searching: {e}", exc_info=True)
             return []
     
+    def _semantic_cache_get(self, embedding: Any, top_k: int) -> Optional[List[Dict[str, Any]]]:
+        with self._semantic_lock:
+            if self._semantic_vectors is None:
+                return None
+            vector = embedding / (np.linalg.norm(embedding) or 1.0)
+            similarities = self._semantic_vectors @ vector
+            now = time.monotonic()
+            for slot in np.argsort(similarities)[::-1]:
+                if similarities[slot] < self.SEMANTIC_CACHE_THRESHOLD:
+                    break
+                entry = self._semantic_entries[slot]
+                if entry is not None and entry[0] > now and entry[1] == top_k:
+                    return entry[2]
+            return None
+    
+    def _semantic_cache_set(self, embedding: Any, top_k: int, results: List[Dict[str, Any]]) -> None:
+        with self._semantic_lock:
+            if self._semantic_vectors is None:
+                self._semantic_vectors = np.zeros((self.SEMANTIC_CACHE_SIZE, embedding.shape[0]), dtype='float32')
+                self._semantic_entries = [None] * self.SEMANTIC_CACHE_SIZE
+            slot = self._semantic_next
+            self._semantic_vectors[slot] = embedding / (np.linalg.norm(embedding) or 1.0)
+            self._semantic_entries[slot] = (time.monotonic() + self.SEMANTIC_CACHE_TTL, top_k, results)
+            self._semantic_next = (slot + 1) % self.SEMANTIC_CACHE_SIZE
+    
+    def clear_semantic_cache(self) -> None:
+        with self._semantic_lock:
+            self._semantic_vectors = None
+            self._semantic_entries = []
+            self._semantic_next = 0
+    
     def rebuild_index(self) -> None:
         logger.info("Rebuilding FAISS index")
         self._build_index()
+        self.clear_semantic_cache()
 
 
 _rag_service: Optional[RAGService] = None
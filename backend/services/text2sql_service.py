@@ -16,6 +16,8 @@ except ImportError:
     PromptTemplate = None
     BaseChatModel = None
 
+from sqlalchemy import text
+
 from models.database import engine
 
 logger = logging.getLogger(__name__)
@@ -190,32 +192,9 @@ SQL Query:
         try:
             sql = self.sanitize_sql(sql)
             
-            from sqlalchemy import text
-            from models.database import engine
-            
             logger.info(f"Executing SQL: {sql}")
             with engine.connect() as conn:
-                result = conn.execute(text(sql))
-                rows = result.fetchall()
-                
-                columns = result.keys() if hasattr(result, 'keys') else None
-                
-                results = []
-                for row in rows:
-                    if columns:
-                        row_dict = dict(zip(columns, row))
-                    else:
-                        row_dict = {
-                            "id": row[0] if len(row) > 0 else None,
-                            "name": row[1] if len(row) > 1 else None,
-                            "location": row[2] if len(row) > 2 else None,
-                            "district": row[3] if len(row) > 3 else None,
-                            "hours": row[4] if len(row) > 4 else None,
-                            "services": row[5] if len(row) > 5 else None,
-                            "lat": float(row[6]) if len(row) > 6 and row[6] is not None else None,
-                            "lon": float(row[7]) if len(row) > 7 and row[7] is not None else None,
-                        }
-                    results.append(row_dict)
+                results = [dict(row) for row in conn.execute(text(sql)).mappings()]
                 
                 logger.info(f"Query returned {len(results)} results")
                 return results
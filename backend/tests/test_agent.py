@@ -403,3 +403,55 @@ def test_memory_slots_tracking():
     assert "slots" in memory2
     assert memory2["history_length"] > memory1["history_length"]
 
+
+
+def test_chat_calculator_fast_path():
+    """Bare arithmetic is routed straight to the calculator"""
+    response = client.post("/chat", json={
+        "message": "(3 * 4) / 2",
+        "history": []
+    })
+    assert response.status_code == 200
+    data = response.json()
+    assert data["intent"] == "calculator"
+    assert data["tool_calls"][0]["input"]["expression"] == "(3 * 4) / 2"
+    assert "6.0" in data["response"]
+
+
+def test_chat_calculator_fast_path_skips_dates():
+    """Date-shaped input is not evaluated as subtraction"""
+    response = client.post("/chat", json={"message": "2025-01-01", "history": []})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["intent"] != "calculator"
+    assert "2023" not in data["response"]
+
+
+def test_chat_greeting_requires_whole_word():
+    """Words that merely contain "hi" are not treated as greetings"""
+    response = client.post("/chat", json={"message": "Is this thing on?", "history": []})
+    assert response.status_code == 200
+    assert not response.json()["response"].startswith("Hello!")
+
+
+def test_chat_reset_requires_whole_word():
+    """Words that merely contain "clear" do not reset the conversation"""
+    response = client.post("/chat", json={"message": "I'm unclear about this", "history": []})
+    assert response.status_code == 200
+    assert response.json()["intent"] != "reset"
+
+
+def test_memory_summary_hides_private_context():
+    """Internal lookup state (underscore keys) is not exposed in the memory summary"""
+    from services.memory_manager import MemoryManager
+    manager = MemoryManager()
+    summary = manager.commit_turn("s", [], context_updates={"last_outlets": [], "_last_outlets_idx": {}})
+    assert summary["context_keys"] == ["last_outlets"]
+
+
+def test_clarification_turn_is_recorded():
+    """A turn that only asks for missing parameters still lands in history"""
+    client.post("/chat", json={"message": "reset", "history": []})
+    response = client.post("/chat", json={"message": "calculate", "history": []})
+    assert response.status_code == 200
+    assert response.json()["memory"]["history_length"] == 1
@@ -225,6 +225,45 @@ def test_calculate_with_whitespace():
     assert data["error"] is None
 
 
+def test_calculate_unsupported_operator():
+    response = client.post(
+        "/calculate",
+        json={"expression": "~5"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["result"] is None
+    assert "Invalid expression" in data["error"]
+
+
+def test_calculate_expression_too_long():
+    response = client.post(
+        "/calculate",
+        json={"expression": "1" + "+1" * 300}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["result"] is None
+    assert "too long" in data["error"]
+
+
+def test_calculate_expression_too_deeply_nested():
+    response = client.post(
+        "/calculate",
+        json={"expression": "-" * 300 + "1"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["result"] is None
+    assert data["error"] is not None
+
+
+def test_calculate_long_flat_sum():
+    response = client.post("/calculate", json={"expression": "+".join(["1"] * 100)})
+    assert response.status_code == 200
+    assert response.json()["result"] == 100.0
+
+
 def test_calculate_missing_operands():
     """Test Part 5: Missing parameters - Calculate with no operands"""
     response = client.post(
@@ -0,0 +1,99 @@
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+from main import app
+from middleware.cors import FastCORS
+
+client = TestClient(app)
+
+ALLOWED_ORIGIN = "http://localhost:5173"
+
+
+def test_cors_preflight_allowed_origin():
+    response = client.options(
+        "/calculate",
+        headers={
+            "Origin": ALLOWED_ORIGIN,
+            "Access-Control-Request-Method": "POST",
+            "Access-Control-Request-Headers": "content-type",
+        }
+    )
+    assert response.status_code == 200
+    assert response.headers["access-control-allow-origin"] == ALLOWED_ORIGIN
+    assert response.headers["access-control-allow-credentials"] == "true"
+    assert response.headers["access-control-allow-headers"] == "content-type"
+    assert "POST" in response.headers["access-control-allow-methods"]
+
+
+def test_cors_preflight_disallowed_origin():
+    response = client.options(
+        "/calculate",
+        headers={
+            "Origin": "http://evil.example.com",
+            "Access-Control-Request-Method": "POST",
+        }
+    )
+    assert response.status_code == 400
+    assert "access-control-allow-origin" not in response.headers
+
+
+def test_cors_simple_request_allowed_origin():
+    response = client.post(
+        "/calculate",
+        json={"expression": "1 + 1"},
+        headers={"Origin": ALLOWED_ORIGIN}
+    )
+    assert response.status_code == 200
+    assert response.headers["access-control-allow-origin"] == ALLOWED_ORIGIN
+    assert response.headers["vary"] == "Origin"
+
+
+def test_cors_simple_request_disallowed_origin():
+    response = client.post(
+        "/calculate",
+        json={"expression": "1 + 1"},
+        headers={"Origin": "http://evil.example.com"}
+    )
+    assert response.status_code == 200
+    assert "access-control-allow-origin" not in response.headers
+
+
+def _restricted_client() -> TestClient:
+    restricted = FastAPI()
+
+    @restricted.get("/varied")
+    def varied():
+        return Response("ok", headers={"Vary": "Accept-Encoding"})
+
+    restricted.add_middleware(
+        FastCORS, allow_origins=(ALLOWED_ORIGIN,), allow_methods=("GET",), allow_headers=("x-token",)
+    )
+    return TestClient(restricted)
+
+
+def test_cors_preflight_disallowed_method():
+    response = _restricted_client().options(
+        "/varied",
+        headers={"Origin": ALLOWED_ORIGIN, "Access-Control-Request-Method": "DELETE"}
+    )
+    assert response.status_code == 400
+    assert response.text == "Disallowed CORS method"
+
+
+def test_cors_preflight_disallowed_header():
+    response = _restricted_client().options(
+        "/varied",
+        headers={
+            "Origin": ALLOWED_ORIGIN,
+            "Access-Control-Request-Method": "GET",
+            "Access-Control-Request-Headers": "x-token, x-other",
+        }
+    )
+    assert response.status_code == 400
+    assert response.text == "Disallowed CORS headers"
+
+
+def test_cors_merges_existing_vary_header():
+    response = _restricted_client().get("/varied", headers={"Origin": ALLOWED_ORIGIN})
+    assert response.status_code == 200
+    assert response.headers.get_list("vary") == ["Accept-Encoding, Origin"]
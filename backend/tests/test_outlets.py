@@ -152,3 +152,12 @@ def test_outlets_response_structure_always_valid():
             assert isinstance(data["results"], list)
             assert isinstance(data["sql_query"], (str, type(None)))
 
+
+
+def test_search_outlets_etag_not_modified():
+    response = client.get("/outlets?query=outlets in Petaling Jaya")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    cached = client.get("/outlets?query=outlets in Petaling Jaya", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
@@ -1,3 +1,4 @@
+import json
 import pytest
 from fastapi.testclient import TestClient
 from main import app
@@ -139,3 +140,41 @@ def test_products_ai_generated_summary():
         if data["results"]:
             assert data["summary"] is not None
 
+
+
+def test_search_products_etag_not_modified():
+    response = client.get("/products?query=tumbler")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    cached = client.get("/products?query=tumbler", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+
+def test_search_products_etag_list_and_weak_match():
+    etag = client.get("/products?query=tumbler").headers["etag"]
+    for if_none_match in (f'"other", {etag}', f"W/{etag}", "*"):
+        cached = client.get("/products?query=tumbler", headers={"If-None-Match": if_none_match})
+        assert cached.status_code == 304
+    changed = client.get("/products?query=tumbler", headers={"If-None-Match": '"other"'})
+    assert changed.status_code == 200
+
+
+def test_search_products_stream_ignores_etag():
+    etag = client.get("/products?query=tumbler").headers["etag"]
+    response = client.get("/products?query=tumbler&stream=true", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert "etag" not in response.headers
+
+
+def test_search_products_stream_ndjson():
+    response = client.get("/products?query=tumbler&stream=true")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    for line in response.text.splitlines():
+        assert "name" in json.loads(line)
+
+
+def test_search_products_top_k_out_of_range():
+    response = client.get("/products?query=tumbler&top_k=0")
+    assert response.status_code == 422